@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for the shortcode-to-media-ID decoder
+
+Checks the scalar and batch decoders against a known shortcode/ID pair and
+the uint64 boundaries, and against the original charmap.index
+implementation, then times all three. The full correctness tests live in
+tests/test_decoder.py.
+
+    python benchmarks/bench_decoder.py --entries 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from instagram_unliker import (  # noqa: E402
+    SHORTCODE_ALPHABET, instagram_code_to_media_id, decode_media_ids
+)
+
+KNOWN_PAIRS = [
+    ("ybyPRoQWzX", 908540701891980503),
+    ("H__________", 2 ** 63 - 1),
+    ("P__________", 2 ** 64 - 1),
+]
+
+
+def legacy_code_to_media_id(code):
+    """The decoder as it shipped before the lookup table"""
+    charmap = SHORTCODE_ALPHABET
+    code = code.split('/')[-2]
+    return sum(charmap.index(char) * (64 ** i) for i, char in enumerate(reversed(code)))
+
+
+def media_id_to_shortcode(media_id):
+    code = ''
+    while media_id:
+        media_id, remainder = divmod(media_id, 64)
+        code = SHORTCODE_ALPHABET[remainder] + code
+    return code or 'A'
+
+
+def make_hrefs(count, seed=1):
+    rng = random.Random(seed)
+    kinds = ('p', 'reel', 'tv')
+    return [
+        f"https://www.instagram.com/{rng.choice(kinds)}/{media_id_to_shortcode(rng.getrandbits(62))}/"
+        for _ in range(count)
+    ]
+
+
+def check_correctness(hrefs):
+    for code, media_id in KNOWN_PAIRS:
+        href = f"https://www.instagram.com/p/{code}/"
+        assert instagram_code_to_media_id(href) == media_id, code
+        assert int(decode_media_ids([href])[0]) == media_id, code
+    expected = [legacy_code_to_media_id(href) for href in hrefs]
+    assert [instagram_code_to_media_id(href) for href in hrefs] == expected
+    assert [int(media_id) for media_id in decode_media_ids(hrefs)] == expected
+
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {count / elapsed:12,.0f} ids/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100_000)
+    args = parser.parse_args()
+
+    hrefs = make_hrefs(args.entries)
+    check_correctness(hrefs[:10_000])
+    print(f"Correctness checks passed ({len(KNOWN_PAIRS)} known pairs, "
+          f"{min(len(hrefs), 10_000)} legacy comparisons)")
+
+    try:
+        import numpy  # noqa: F401
+        backend = 'numpy'
+    except ImportError:
+        backend = 'array'
+
+    timed("legacy charmap.index", lambda: [legacy_code_to_media_id(h) for h in hrefs], len(hrefs))
+    timed("scalar lookup table", lambda: [instagram_code_to_media_id(h) for h in hrefs], len(hrefs))
+    timed(f"batch ({backend})", lambda: decode_media_ids(hrefs), len(hrefs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Memory/throughput benchmark for the liked_posts.json reader
+
+Generates a synthetic export and compares json.load against the streaming
+iter_liked_posts reader. Each reader runs in its own subprocess so peak RSS
+is measured independently.
+
+    python benchmarks/bench_parser.py --entries 1000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHARMAP = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+
+def write_synthetic_export(path, entries, seed=1):
+    """Write an export shaped like Instagram's liked_posts.json"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n    "likes_media_likes": [\n')
+        for i in range(entries):
+            code = ''.join(rng.choice(CHARMAP) for _ in range(11))
+            entry = {
+                "title": f"author_{rng.randrange(5000)}",
+                "string_list_data": [{
+                    "href": f"https://www.instagram.com/p/{code}/",
+                    "value": "\U0001f44d",
+                    "timestamp": 1400000000 + i
+                }]
+            }
+            f.write(('        ' if i == 0 else ',\n        ') + json.dumps(entry))
+        f.write('\n    ]\n}\n')
+
+
+def _run_reader(mode, path):
+    """Parse the export with one reader and print a JSON result line"""
+    import resource
+    from instagram_unliker import iter_liked_posts
+    start = time.perf_counter()
+    first = None
+    count = 0
+    if mode == 'json.load':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        for entry in data['likes_media_likes']:
+            for item in entry['string_list_data']:
+                if first is None:
+                    first = time.perf_counter() - start
+                count += 1
+    else:
+        with open(path, encoding='utf-8') as f:
+            for _ in iter_liked_posts(f):
+                if first is None:
+                    first = time.perf_counter() - start
+                count += 1
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    print(json.dumps({
+        "reader": mode,
+        "records": count,
+        "seconds": round(elapsed, 3),
+        "first_record_ms": round((first or 0) * 1000, 3),
+        "records_per_sec": round(count / elapsed) if elapsed else None,
+        "peak_rss_mb": round(rss / 1024, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--export', help="reuse an existing export instead of generating one")
+    parser.add_argument('--_reader', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._reader:
+        _run_reader(args._reader, args.export)
+        return
+
+    tmpdir = None
+    path = args.export
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, 'liked_posts.json')
+        print(f"Generating {args.entries} entries...", file=sys.stderr)
+        write_synthetic_export(path, args.entries)
+    print(f"Export size: {os.path.getsize(path) / 1e6:.1f} MB", file=sys.stderr)
+
+    try:
+        for mode in ('json.load', 'stream'):
+            subprocess.run([sys.executable, __file__, '--export', path, '--_reader', mode], check=True)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
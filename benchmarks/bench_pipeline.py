@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""End-to-end pipeline benchmark against the local fake client
+
+Runs ingest (parse, decode, compile), the unlike engine with pacing
+disabled, the journal and the stats queries on synthetic exports, each size
+in its own subprocess and scratch directory so peak RSS and bytes written
+are measured independently.
+
+    python benchmarks/bench_pipeline.py --sizes 10000 100000 1000000
+
+With --profile DIR, each size's run is also profiled (spans and cProfile)
+into a directory under DIR, with pacing off as usual. With --errors-as-false
+the fake client answers injected errors by returning False, as ensta's
+Web.unlike does, instead of raising.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_decoder import media_id_to_shortcode  # noqa: E402
+
+ACCOUNT = 'bench'
+
+
+def write_export(path, entries, seed=1):
+    """liked_posts.json with unique shortcodes that decode to 64-bit media IDs"""
+    rng = random.Random(seed)
+    kinds = ('p', 'reel', 'tv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n    "likes_media_likes": [\n')
+        for i in range(entries):
+            code = media_id_to_shortcode(rng.getrandbits(62))
+            entry = {
+                "title": f"author_{rng.randrange(5000)}",
+                "string_list_data": [{
+                    "href": f"https://www.instagram.com/{rng.choice(kinds)}/{code}/",
+                    "value": "\U0001f44d",
+                    "timestamp": 1400000000 + i
+                }]
+            }
+            f.write(('        ' if i == 0 else ',\n        ') + json.dumps(entry))
+        f.write('\n    ]\n}\n')
+
+
+def parse_errors(spec):
+    """'404=0.001,500=0.002' -> {404: 0.001, 500: 0.002}"""
+    rates = {}
+    for part in filter(None, spec.split(',')):
+        status, _, rate = part.partition('=')
+        rates[int(status)] = float(rate)
+    return rates
+
+
+def bytes_written():
+    """Bytes this process has passed to write(), where the OS reports it"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def tree_size(path, exclude):
+    total = 0
+    for directory, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(directory, name)
+            if file_path != exclude:
+                total += os.path.getsize(file_path)
+    return total
+
+
+def _run_size(entries, workdir, args):
+    """Run the whole pipeline once in workdir and print a JSON result line"""
+    import resource
+    os.chdir(workdir)
+    export_path = os.path.join(workdir, 'liked_posts.json')
+    write_export(export_path, entries)
+
+    from instagram_unliker import CONFIG, InstagramUnliker, FakeInstagramClient
+
+    written_before = bytes_written()
+    timings = {}
+    # Left open: the exit hooks log through the console handler created here
+    devnull = open(os.devnull, 'w')
+    with contextlib.redirect_stdout(devnull):
+        unliker = InstagramUnliker()
+        # Pacing disabled: only local overhead is left to measure
+        CONFIG['delay'] = {"min": 0, "max": 0}
+        CONFIG['break']['probability'] = 0
+        CONFIG['pacing']['jitter'] = 0
+        CONFIG['retry_delay'] = 0
+        CONFIG['export']['path'] = export_path
+        unliker.store.add_account(ACCOUNT, 'benchmark')
+        CONFIG['accounts'] = unliker.store.account_options()
+        errors = parse_errors(args.errors)
+        unliker.client_factory = lambda username, password: FakeInstagramClient(
+            username, latency=args.latency, error_rates=errors, seed=1, errors_as_false=args.errors_as_false
+        )
+        unliker.progress_stream = io.StringIO()
+        unliker.progress_interval = float('inf')
+        if args.profile:
+            unliker.profile_dir = Path(args.profile)
+            unliker.profiling = {"cprofile": True, "tracemalloc": False, "interval": 3600}
+
+        started = time.perf_counter()
+        unliker.ingest(ACCOUNT)
+        timings['ingest'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        exit_code = unliker.unlike_posts(ACCOUNT)
+        timings['unlike'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        status = unliker.account_status(ACCOUNT)
+        unliker.store.totals()
+        unliker.store.recent_runs()
+        timings['stats'] = time.perf_counter() - started
+
+    written_after = bytes_written()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    queue = status['queue']
+    print(json.dumps({
+        "entries": entries,
+        "exit_code": exit_code,
+        "done": queue['done'],
+        "failed": queue['failed'],
+        "ingest_s": round(timings['ingest'], 3),
+        "unlike_s": round(timings['unlike'], 3),
+        "stats_ms": round(timings['stats'] * 1000, 2),
+        "ingest_per_sec": round(entries / timings['ingest']),
+        "unlike_per_sec": round(queue['done'] / timings['unlike']) if timings['unlike'] else None,
+        "peak_rss_mb": round(rss / 1024, 1),
+        "bytes_written": (written_after - written_before) if written_before is not None else None,
+        "state_bytes": tree_size(workdir, export_path),
+        "unlike_time_s": unliker.metrics.snapshot()['accounts'][ACCOUNT]['time_seconds']
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds per fake unlike call")
+    parser.add_argument('--errors', default='404=0.001,429=0.00002,500=0.001',
+                        help="injected error rates, e.g. 404=0.001,429=0.0001,500=0.001")
+    parser.add_argument('--errors-as-false', action='store_true',
+                        help="return False from unlike instead of raising, like ensta.Web.unlike")
+    parser.add_argument('--profile', metavar='DIR', help="profile each run into a directory under DIR")
+    parser.add_argument('--_size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--_workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._size:
+        _run_size(args._size, args._workdir, args)
+        return
+
+    header = f"{'entries':>9} {'ingest/s':>10} {'unlike/s':>10} {'stats ms':>9} {'peak MB':>8} {'written MB':>11} {'state MB':>9}"
+    print(header)
+    for entries in args.sizes:
+        # The parent owns the scratch directory so the child's exit hooks can still write to it
+        with tempfile.TemporaryDirectory() as workdir:
+            result = subprocess.run(
+                [sys.executable, __file__, '--_size', str(entries), '--_workdir', workdir,
+                 '--latency', str(args.latency), '--errors', args.errors]
+                + (['--errors-as-false'] if args.errors_as_false else [])
+                + (['--profile', os.path.abspath(args.profile)] if args.profile else []),
+                stdout=subprocess.PIPE, text=True, check=True
+            )
+        row = next(json.loads(line) for line in result.stdout.splitlines() if line.startswith('{'))
+        written = row['bytes_written']
+        print(f"{row['entries']:>9} {row['ingest_per_sec']:>10} {row['unlike_per_sec']:>10} "
+              f"{row['stats_ms']:>9} {row['peak_rss_mb']:>8} "
+              f"{written / 1e6 if written is not None else float('nan'):>11.1f} {row['state_bytes'] / 1e6:>9.1f}")
+        if row['exit_code'] not in (0, 6):
+            print(f"  run exited with {row['exit_code']}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
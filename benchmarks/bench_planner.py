@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Speed and accuracy check for the Monte Carlo run planner
+
+Times RunPlanner.estimate on large queues, then compares its P50/P90 with a
+brute-force simulation that steps through every item the way the run loop
+does. Exits non-zero if an estimate drifts more than --tolerance from the
+brute-force quantile.
+
+    python benchmarks/bench_planner.py --items 100000 --simulations 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from instagram_unliker import RunPlanner, format_duration  # noqa: E402
+
+SETTINGS = dict(min_interval=20, max_interval=100, jitter=0.5, speed_up_step=1.0, break_min=900,
+                break_max=3600, break_probability=0.01, failure_rate=0.01, retry_cost=90, latency=1.0)
+
+
+def brute_force(items, rng):
+    """One run, item by item"""
+    interval = (SETTINGS['min_interval'] + SETTINGS['max_interval']) / 2
+    total = 0.0
+    for _ in range(items):
+        total += max(interval, SETTINGS['latency']) + rng.uniform(0, SETTINGS['jitter'] * interval)
+        if rng.random() < SETTINGS['failure_rate']:
+            total += SETTINGS['retry_cost']
+            continue
+        interval = max(SETTINGS['min_interval'], interval - SETTINGS['speed_up_step'])
+        if rng.random() < SETTINGS['break_probability']:
+            total += rng.uniform(SETTINGS['break_min'], SETTINGS['break_max'])
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--simulations', type=int, default=2000)
+    parser.add_argument('--check-items', type=int, default=2000, help="queue size for the accuracy check")
+    parser.add_argument('--check-runs', type=int, default=300, help="brute-force runs for the accuracy check")
+    parser.add_argument('--tolerance', type=float, default=0.05, help="allowed relative quantile error")
+    args = parser.parse_args()
+
+    planner = RunPlanner(**SETTINGS)
+    try:
+        import numpy  # noqa: F401
+        backend = 'numpy'
+    except ImportError:
+        backend = 'python'
+
+    start = time.perf_counter()
+    estimate = planner.estimate(args.items, args.simulations, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"{args.items} items x {args.simulations} simulations ({backend}): {elapsed * 1000:.1f} ms, "
+          f"P50 {format_duration(estimate['p50'])}, P90 {format_duration(estimate['p90'])}")
+
+    rng = random.Random(1)
+    runs = sorted(brute_force(args.check_items, rng) for _ in range(args.check_runs))
+    expected = {'p50': runs[int(0.5 * (len(runs) - 1))], 'p90': runs[int(0.9 * (len(runs) - 1))]}
+    estimate = planner.estimate(args.check_items, args.simulations, seed=1)
+    failures = []
+    for key, value in expected.items():
+        error = abs(estimate[key] - value) / value
+        print(f"{args.check_items} items {key}: planner {format_duration(estimate[key])}, "
+              f"brute force {format_duration(value)} ({error:.1%} apart)")
+        if error > args.tolerance:
+            failures.append(f"{key} is {error:.1%} off, tolerance is {args.tolerance:.0%}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
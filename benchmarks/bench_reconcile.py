@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Speed and accuracy check for reconciling a fresh export
+
+Ingests a synthetic export, marks part of it unliked (journal) and failed
+(work index and dead letters), then reconciles a second export in which
+most unliked posts, some failed and some pending posts are gone and new
+likes were added. Exits non-zero if the report, the carried-over state or
+the pruned dead letters differ from plain set arithmetic.
+
+    python benchmarks/bench_reconcile.py --entries 300000 --new 20000
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_decoder import media_id_to_shortcode  # noqa: E402
+
+ACCOUNT = 'reconcile'
+
+
+def write_ids(path, media_ids):
+    """liked_posts.json listing media_ids in order"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"likes_media_likes": [\n')
+        f.write(',\n'.join(json.dumps({
+            "title": f"author_{media_id % 997}",
+            "string_list_data": [{"href": f"https://www.instagram.com/p/{media_id_to_shortcode(media_id)}/",
+                                  "value": "\U0001f44d", "timestamp": 1400000000 + i}]
+        }) for i, media_id in enumerate(media_ids)))
+        f.write('\n]}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=300_000, help="posts in the first export")
+    parser.add_argument('--new', type=int, default=20_000, help="posts liked since the first export")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    old_ids = list({rng.getrandbits(62) for _ in range(args.entries)})
+    rng.shuffle(old_ids)
+    done = set(old_ids[:int(len(old_ids) * 0.6)])
+    failed = set(rng.sample(old_ids[len(done):], len(old_ids) // 100))
+    pending = set(old_ids) - done - failed
+    gone = (set(rng.sample(sorted(done), int(len(done) * 0.9)))
+            | set(rng.sample(sorted(failed), len(failed) // 2))
+            | set(rng.sample(sorted(pending), len(pending) // 20)))
+    added = [rng.getrandbits(62) for _ in range(args.new)]
+    new_ids = [media_id for media_id in old_ids if media_id not in gone] + added
+    rng.shuffle(new_ids)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        write_ids('old.json', old_ids)
+        write_ids('new.json', new_ids)
+
+        from instagram_unliker import CONFIG, InstagramUnliker, WorkIndex, DeadLetterQueue
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            unliker = InstagramUnliker()
+            unliker.store.add_account(ACCOUNT, 'benchmark')
+            CONFIG['accounts'] = unliker.store.account_options()
+            CONFIG['export']['path'] = 'old.json'
+            unliker.ingest(ACCOUNT)
+
+            index = WorkIndex(unliker.index_dir / f"{ACCOUNT}.idx")
+            dead_letters = DeadLetterQueue(unliker.deadletter_dir / f"{ACCOUNT}.jsonl")
+            for position in range(len(index)):
+                if index.media_id(position) in failed:
+                    index.mark_failed(position)
+            index.close()
+            dead_letters.replace([{"media_id": media_id, "kind": "permanent", "reason": "404", "attempts": 1}
+                                  for media_id in sorted(failed)])
+            unliker.journal_dir.mkdir(parents=True, exist_ok=True)
+            with open(unliker.journal_dir / f"{ACCOUNT}.journal", 'w') as f:
+                f.writelines(f"{media_id}\n" for media_id in done)
+
+            CONFIG['export']['path'] = 'new.json'
+            started = time.perf_counter()
+            report = unliker.reconcile(ACCOUNT)
+            elapsed = time.perf_counter() - started
+
+        try:
+            import numpy  # noqa: F401
+            backend = 'numpy'
+        except ImportError:
+            backend = 'python'
+        print(f"{len(old_ids)} -> {len(new_ids)} posts ({backend}): {elapsed:.2f} s total, "
+              f"{report['queued']} queued")
+
+        new_set = set(new_ids)
+        expected = {
+            "total": len(new_ids),
+            "queued": len(added) + len(pending - gone),
+            "newly_liked": len(added),
+            "still_pending": len(pending - gone),
+            "failed_still_liked": len(failed - gone),
+            "unliked_still_listed": len(done - gone),
+            "confirmed_removed": len(done & gone),
+            "failed_removed": len(failed & gone),
+            "removed_elsewhere": len(pending & gone),
+            "dead_letters_cleared": len(failed & gone)
+        }
+        errors = [f"{key}: {report[key]} != {value}" for key, value in expected.items() if report[key] != value]
+
+        index = WorkIndex(unliker.index_dir / f"{ACCOUNT}.idx")
+        for position in range(len(index)):
+            media_id = index.media_id(position)
+            state = (index.is_done(position), index.is_failed(position))
+            want = (media_id in done, media_id in failed)
+            if state != want:
+                errors.append(f"media ID {media_id}: done/failed {state} != {want}")
+                break
+        index.close()
+        kept = {entry['media_id'] for entry in dead_letters.load()}
+        if kept != failed & new_set:
+            errors.append(f"dead letters: {len(kept)} kept, {len(failed & new_set)} expected")
+
+    for error in errors:
+        print(f"  mismatch {error}", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
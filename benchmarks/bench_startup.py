@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Import-time and cold-start regression check
+
+Runs `python -X importtime` on the module and fails if a heavy dependency
+is imported at module load or the import goes over budget, then times a
+few headless commands from a scratch working directory.
+
+    python benchmarks/bench_startup.py --budget-ms 150
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'instagram_unliker.py')
+
+# Only the code paths that need these may import them
+LAZY_MODULES = ('tqdm', 'ensta', 'psutil', 'pip', 'numpy', 'urllib.request', 'importlib.metadata')
+
+COMMANDS = [
+    ['--help'],
+    ['status', '--json'],
+    ['stats', '--json'],
+]
+
+
+def import_profile():
+    """(cumulative microseconds, {module: cumulative microseconds}) for one cold import"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import instagram_unliker'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules.get('instagram_unliker', 0), modules
+
+
+def time_command(args, workdir, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, SCRIPT] + args, cwd=workdir,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=150,
+                        help="fail if importing the module takes longer than this")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    runs = [import_profile() for _ in range(args.repeat)]
+    total_ms = statistics.median(total for total, _ in runs) / 1000
+    modules = runs[-1][1]
+    print(f"import instagram_unliker: {total_ms:.1f} ms (median of {args.repeat})")
+    for name, cumulative in sorted(modules.items(), key=lambda item: -item[1])[1:9]:
+        print(f"  {name:<28} {cumulative / 1000:7.1f} ms")
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, budget is {args.budget_ms:.0f} ms")
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        failures.append(f"imported at module load: {', '.join(eager)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for command in COMMANDS:
+            elapsed = time_command(command, workdir, args.repeat)
+            print(f"instagram_unliker.py {' '.join(command):<16} {elapsed * 1000:7.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
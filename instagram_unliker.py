@@ -8,17 +8,36 @@ import logging
 import platform
 import subprocess
 import shutil
+import argparse
+import contextlib
 import threading
+import itertools
+import copy
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Iterator, IO
+from collections import namedtuple, deque, Counter
+from types import SimpleNamespace
 from getpass import getpass
 import webbrowser
 import signal
-from tqdm import tqdm
-import urllib.request
 import tempfile
-from logging.handlers import RotatingFileHandler
+import re
+import io
+import zipfile
+import sqlite3
+import asyncio
+import functools
+import math
+import bisect
+import email.utils
+from concurrent.futures import ThreadPoolExecutor
+import mmap
+import struct
+from array import array
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import queue
+import gzip
 import atexit
 
 # Global logging configuration
@@ -43,6 +62,29 @@ CONFIG = {
     "log_level": "INFO",
     "max_retries": 3,
     "retry_delay": 60,  # 1 minute
+    "export": {
+        "path": "liked_posts.json",  # liked_posts.json or the data-download ZIP
+        "include_comment_likes": False  # Also queue posts whose comments you liked
+    },
+    "pacing": {
+        "burst": 1,  # Requests allowed back to back after an idle period
+        "jitter": 0.5,  # Random extra wait, as a fraction of the interval
+        "speed_up_step": 1.0,  # Seconds taken off the interval per healthy response
+        "slow_down_factor": 2.0,  # Interval multiplier when throttled
+        "max_interval": 3600  # Slowest pacing when repeatedly throttled
+    },
+    "session": {
+        "max_age_days": 30  # Force a full login once a cached session is this old
+    },
+    "journal": {
+        "flush_every": 10,  # fsync after this many unliked posts
+        "flush_interval": 30  # ...or after this many seconds
+    },
+    "metrics": {
+        "port": 0,  # Serve Prometheus metrics on 127.0.0.1 during runs; 0 disables
+        "snapshot_path": "metrics.json",  # JSON snapshot rewritten during runs; empty disables
+        "snapshot_interval": 30  # Seconds between snapshot rewrites
+    },
     "auto_update": True,
     "python_min_version": "3.7.0"  # Minimum required Python version
 }
@@ -61,15 +103,2635 @@ class ConsoleColors:
     UNDERLINE = '\033[4m'# Underline
     RESET = '\033[0m'    # Reset all formatting
     
+class ProgressJournal:
+    """Append-only journal of media IDs that have been unliked
+
+    The export file is never modified. Completed media IDs are appended one per
+    line and fsynced in groups, so resuming only needs the export minus the
+    journal and a crash can at worst lose the last unsynced group.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 10, flush_interval: float = 30, on_flush=None):
+        self.path = Path(path)
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush  # Called with the synced byte offset after every flush
+        self.offset = 0
+        self._pending: List[bytes] = []
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._lock = threading.Lock()  # Guards the pending list
+        self._write_lock = threading.Lock()  # Serializes file writes
+
+    def load(self, start: int = 0) -> set:
+        """Return the set of media IDs recorded as unliked after byte offset start"""
+        done = set()
+        self.offset = start
+        if not self.path.exists():
+            return done
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                # A line without newline is a torn write from a crash
+                if not line.endswith(b'\n'):
+                    break
+                self.offset += len(line)
+                try:
+                    done.add(int(line))
+                except ValueError:
+                    logging.warning(f"Skipping malformed journal line in {self.path}: {line!r}")
+        return done
+
+    def open(self):
+        """Open the journal for appending, dropping any torn trailing line"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab+')
+        size = self._file.seek(0, os.SEEK_END)
+        if size:
+            self._file.seek(size - 1)
+            if self._file.read(1) != b'\n':
+                self._file.seek(0)
+                data = self._file.read()
+                self._file.truncate(data.rfind(b'\n') + 1)
+                self._file.seek(0, os.SEEK_END)
+        self._last_flush = time.monotonic()
+        return self
+
+    def record(self, media_id: int, sync: bool = True) -> bool:
+        """Queue a completed media ID and report whether a group is full or stale
+
+        With sync=True a due group is flushed right away; otherwise the caller
+        is expected to call flush(), possibly from another thread.
+        """
+        with self._lock:
+            self._pending.append(b'%d\n' % media_id)
+            due = (len(self._pending) >= self.flush_every
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due and sync:
+            self.flush()
+        return due
+
+    def flush(self):
+        """Write queued entries and fsync them to disk
+
+        on_flush runs even when nothing was queued, so state kept alongside
+        the journal (failures, counters) is saved by every flush.
+        """
+        with self._write_lock:
+            if self._file is None:
+                return
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if pending:
+                self._file.write(b''.join(pending))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.offset = self._file.tell()
+            if self.on_flush is not None:
+                self.on_flush(self.offset)
+
+    def close(self):
+        """Flush and close the journal"""
+        if self._file is not None:
+            self.flush()
+            with self._write_lock:
+                self._file.close()
+                self._file = None
+
+PostFilter = namedtuple('PostFilter', ['since', 'until', 'authors', 'order'], defaults=(None, None, (), 'export'))
+PostFilter.__doc__ = """Which liked posts a run handles: liked in [since, until) (Unix seconds) on
+any of authors (all when empty), in 'export', 'oldest' or 'newest' order"""
+POST_ORDERS = ('export', 'oldest', 'newest')
+
+def parse_post_date(text: str) -> int:
+    """Unix time of YYYY, YYYY-MM, YYYY-MM-DD or an ISO timestamp, in local time"""
+    text = text.strip()
+    for date_format in ('%Y', '%Y-%m'):
+        try:
+            return int(datetime.strptime(text, date_format).timestamp())
+        except ValueError:
+            pass
+    try:
+        return int(datetime.fromisoformat(text).timestamp())
+    except ValueError:
+        raise ValueError(f"Not a date: {text!r} (use YYYY, YYYY-MM or YYYY-MM-DD)") from None
+
+def describe_post_filter(post_filter: PostFilter) -> str:
+    parts = []
+    if post_filter.since is not None:
+        parts.append(f"liked on or after {datetime.fromtimestamp(post_filter.since):%Y-%m-%d}")
+    if post_filter.until is not None:
+        parts.append(f"liked before {datetime.fromtimestamp(post_filter.until):%Y-%m-%d}")
+    if post_filter.authors:
+        parts.append("by " + ", ".join(f"@{author}" for author in post_filter.authors))
+    parts.append("export order" if post_filter.order == 'export' else f"{post_filter.order} first")
+    return ', '.join(parts)
+
+class WorkIndex:
+    """Compiled, memory-mapped work queue for one account
+
+    Layout (native byte order): a 64 byte header, the uint64 media IDs, their
+    int64 like timestamps and uint32 author numbers, two uint32 permutations
+    of the positions (by timestamp, and by author then timestamp), the uint32
+    start of each author's run in the second one, a done bitmap, a failed
+    bitmap, and finally the author names as newline-separated UTF-8.
+    Iterating is a cursor over the bitmaps and marking an item is a single
+    bit write into the mapping, so nothing is held in Python containers while
+    running. A date range or author selection is a binary search within a
+    permutation rather than a scan.
+    """
+
+    MAGIC = b'IGUIDX01'
+    VERSION = 2
+    # magic, version, flags, count, cursor, source size, source mtime, journal offset, author count
+    HEADER = struct.Struct('=8sIIQQQqQI4x')
+    CURSOR_OFFSET = 24
+    JOURNAL_OFFSET = 48
+    FLAG_COMMENT_LIKES = 1  # Compiled with liked comments included
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'r+b')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Work index {self.path} is empty")
+        if len(self._mm) < self.HEADER.size:
+            self.close()
+            raise ValueError(f"Work index {self.path} is truncated")
+        (magic, version, self.flags, self.count, self._cursor, self.source_size,
+         self.source_mtime_ns, self.journal_offset, self.author_count) = self.HEADER.unpack_from(self._mm, 0)
+        bitmap_size = (self.count + 7) // 8
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(f"Work index {self.path} has an unknown format")
+        if len(self._mm) < self.HEADER.size + 28 * self.count + 4 * (self.author_count + 1) + 2 * bitmap_size:
+            self.close()
+            raise ValueError(f"Work index {self.path} is truncated")
+
+        view = memoryview(self._mm)
+        offset = self.HEADER.size
+        self._ids = view[offset:offset + 8 * self.count].cast('Q')
+        offset += 8 * self.count
+        self._timestamps = view[offset:offset + 8 * self.count].cast('q')
+        offset += 8 * self.count
+        self._authors = view[offset:offset + 4 * self.count].cast('I')
+        offset += 4 * self.count
+        self._by_time = view[offset:offset + 4 * self.count].cast('I')
+        offset += 4 * self.count
+        self._by_author = view[offset:offset + 4 * self.count].cast('I')
+        offset += 4 * self.count
+        self._author_offsets = view[offset:offset + 4 * (self.author_count + 1)].cast('I')
+        offset += 4 * (self.author_count + 1)
+        self._done = view[offset:offset + bitmap_size]
+        offset += bitmap_size
+        self._failed = view[offset:offset + bitmap_size]
+        offset += bitmap_size
+        self._names_offset = offset
+        self._author_names: Optional[List[str]] = None
+        self._author_numbers: Dict[str, List[int]] = {}  # Lower-cased name -> author numbers
+        self._view = view
+
+    @classmethod
+    def compile(cls, path: Path, records, source_path=None, done_ids=(), journal_offset: int = 0,
+                flags: int = 0, failed_ids=()) -> int:
+        """Write a new index from (media_id, timestamp, author) records and return its size
+
+        Items whose media ID is in done_ids are marked done, and the others
+        whose media ID is in failed_ids are marked failed. The file is written
+        next to path and renamed into place, so a crash never leaves a partial
+        index behind.
+        """
+        path = Path(path)
+        ids = array('Q')
+        timestamps = array('q')
+        authors = array('I')
+        author_numbers: Dict[str, int] = {}
+        for media_id, timestamp, author in records:
+            ids.append(media_id)
+            timestamps.append(timestamp or 0)
+            author = (author or '').replace('\n', ' ')
+            number = author_numbers.get(author)
+            if number is None:
+                number = author_numbers[author] = len(author_numbers)
+            authors.append(number)
+        count = len(ids)
+        # Stable sorts, so each author's run stays in timestamp order
+        by_time = array('I', sorted(range(count), key=timestamps.__getitem__))
+        by_author = array('I', sorted(by_time, key=authors.__getitem__))
+        author_offsets = array('I', bytes(4 * (len(author_numbers) + 1)))
+        for number in authors:
+            author_offsets[number + 1] += 1
+        for number in range(len(author_numbers)):
+            author_offsets[number + 1] += author_offsets[number]
+        done = bytearray((count + 7) // 8)
+        failed = bytearray(len(done))
+        if done_ids or failed_ids:
+            for i, media_id in enumerate(ids):
+                if media_id in done_ids:
+                    done[i >> 3] |= 1 << (i & 7)
+                elif media_id in failed_ids:
+                    failed[i >> 3] |= 1 << (i & 7)
+
+        source_size, source_mtime_ns = 0, 0
+        if source_path is not None:
+            stat = os.stat(source_path)
+            source_size, source_mtime_ns = stat.st_size, stat.st_mtime_ns
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, flags, count, 0,
+                                    source_size, source_mtime_ns, journal_offset, len(author_numbers)))
+            for column in (ids, timestamps, authors, by_time, by_author, author_offsets):
+                column.tofile(f)
+            f.write(done)
+            f.write(failed)
+            f.write('\n'.join(author_numbers).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return count
+
+    def is_stale(self, source_path) -> bool:
+        """Check whether the export changed since the index was compiled"""
+        stat = os.stat(source_path)
+        return (stat.st_size, stat.st_mtime_ns) != (self.source_size, self.source_mtime_ns)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def cursor(self) -> int:
+        return self._cursor
+
+    @cursor.setter
+    def cursor(self, value: int):
+        self._cursor = value
+        struct.pack_into('=Q', self._mm, self.CURSOR_OFFSET, value)
+
+    def media_id(self, position: int) -> int:
+        return self._ids[position]
+
+    def timestamp(self, position: int) -> int:
+        return self._timestamps[position]
+
+    def author(self, position: int) -> str:
+        return self.author_names()[self._authors[position]]
+
+    def author_names(self) -> List[str]:
+        """Author names, indexed by author number"""
+        if self._author_names is None:
+            self._author_names = bytes(self._view[self._names_offset:]).decode('utf-8').split('\n')
+            for number, name in enumerate(self._author_names):
+                self._author_numbers.setdefault(name.lower(), []).append(number)
+        return self._author_names
+
+    def _first_at_or_after(self, permutation, lo: int, hi: int, timestamp: int) -> int:
+        """Binary search a timestamp-ordered run of a permutation"""
+        timestamps = self._timestamps
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if timestamps[permutation[middle]] < timestamp:
+                lo = middle + 1
+            else:
+                hi = middle
+        return lo
+
+    def select(self, post_filter: PostFilter) -> array:
+        """Positions matching post_filter, in its order"""
+        if post_filter.order not in POST_ORDERS:
+            raise ValueError(f"Unknown order: {post_filter.order!r}")
+
+        def time_range(permutation, lo, hi):
+            if post_filter.since is not None:
+                lo = self._first_at_or_after(permutation, lo, hi, post_filter.since)
+            if post_filter.until is not None:
+                hi = self._first_at_or_after(permutation, lo, hi, post_filter.until)
+            return permutation[lo:hi].tobytes()
+
+        if post_filter.authors:
+            self.author_names()
+            numbers = sorted({number for name in post_filter.authors
+                              for number in self._author_numbers.get(name.lower(), ())})
+            positions = array('I')
+            for number in numbers:
+                positions.frombytes(time_range(self._by_author, self._author_offsets[number],
+                                               self._author_offsets[number + 1]))
+            if post_filter.order != 'export' and len(numbers) > 1:
+                positions = array('I', sorted(positions, key=self._timestamps.__getitem__))
+        else:
+            positions = array('I', time_range(self._by_time, 0, self.count))
+        if post_filter.order == 'export':
+            positions = array('I', sorted(positions))
+        elif post_filter.order == 'newest':
+            positions.reverse()
+        return positions
+
+    def is_done(self, position: int) -> bool:
+        return bool(self._done[position >> 3] & (1 << (position & 7)))
+
+    def is_failed(self, position: int) -> bool:
+        return bool(self._failed[position >> 3] & (1 << (position & 7)))
+
+    def mark_done(self, position: int):
+        self._done[position >> 3] |= 1 << (position & 7)
+
+    def mark_failed(self, position: int):
+        self._failed[position >> 3] |= 1 << (position & 7)
+
+    def next_pending(self) -> Optional[int]:
+        """Advance the cursor to the next item that is neither done nor failed"""
+        position = self._cursor
+        done, failed = self._done, self._failed
+        while position < self.count:
+            byte = done[position >> 3] | failed[position >> 3]
+            if byte == 0xFF and not position & 7:
+                position += 8  # Skip a whole finished byte at once
+                continue
+            if not byte & (1 << (position & 7)):
+                self.cursor = position
+                return position
+            position += 1
+        self.cursor = self.count
+        return None
+
+    def done_count(self) -> int:
+        return bin(int.from_bytes(self._done, 'little')).count('1')
+
+    def failed_count(self) -> int:
+        return bin(int.from_bytes(self._failed, 'little')).count('1')
+
+    def processed_count(self) -> int:
+        """Number of items that are done or failed"""
+        both = int.from_bytes(self._done, 'little') | int.from_bytes(self._failed, 'little')
+        return bin(both).count('1')
+
+    def requeue_failed(self, media_ids=None) -> int:
+        """Clear failed bits (only for media_ids if given) and rewind the cursor"""
+        requeued = 0
+        for position in range(self.count):
+            if self.is_failed(position) and (media_ids is None or self._ids[position] in media_ids):
+                self._failed[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+                requeued += 1
+        self.cursor = 0
+        self._mm.flush()
+        return requeued
+
+    def locate(self, media_ids) -> array:
+        """Position of each of media_ids in the index, or -1 where it is absent
+
+        Both sides are sorted once and merged (searchsorted with NumPy), so
+        matching two exports of several hundred thousand posts takes a sort
+        instead of a hash set per side.
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None:
+            ids = np.array(self._ids, dtype=np.uint64)  # A copy, so the mapping can still be closed
+            targets = np.array(media_ids, dtype=np.uint64)
+            if not len(ids) or not len(targets):
+                return array('q', [-1]) * len(targets)
+            order = np.argsort(ids, kind='stable')
+            slots = np.searchsorted(ids[order], targets)
+            slots[slots == len(ids)] = 0
+            found = np.where(ids[order][slots] == targets, order[slots], -1)
+            return array('q', found.astype(np.int64).tobytes())
+
+        ids = self._ids
+        targets = media_ids if isinstance(media_ids, (array, memoryview, list)) else list(media_ids)
+        found = array('q', [-1]) * len(targets)
+        order = sorted(range(self.count), key=ids.__getitem__)
+        count = len(order)
+        i = 0
+        for target in sorted(range(len(targets)), key=targets.__getitem__):
+            media_id = targets[target]
+            while i < count and ids[order[i]] < media_id:
+                i += 1
+            if i == count:
+                break
+            if ids[order[i]] == media_id:
+                found[target] = order[i]
+        return found
+
+    def carry_over(self, previous: 'WorkIndex') -> Dict[str, int]:
+        """Copy done and failed state from the index of an earlier export
+
+        Returns how the two exports differ: posts that are new, still pending,
+        failed but still liked, or unliked by us but still listed (the export
+        may predate the unlike) on this side, and posts gone from this export
+        after we unliked them, after they failed, or while still pending.
+        """
+        counts = dict.fromkeys(('newly_liked', 'still_pending', 'failed_still_liked', 'unliked_still_listed',
+                                'confirmed_removed', 'failed_removed', 'removed_elsewhere'), 0)
+        seen = bytearray((previous.count + 7) // 8)
+        for position, old in enumerate(previous.locate(self._ids)):
+            if old < 0:
+                if self.is_done(position):
+                    counts['unliked_still_listed'] += 1
+                else:
+                    counts['failed_still_liked' if self.is_failed(position) else 'newly_liked'] += 1
+                continue
+            seen[old >> 3] |= 1 << (old & 7)
+            if self.is_done(position) or previous.is_done(old):
+                self.mark_done(position)
+                counts['unliked_still_listed'] += 1
+            elif self.is_failed(position) or previous.is_failed(old):
+                self.mark_failed(position)
+                counts['failed_still_liked'] += 1
+            else:
+                counts['still_pending'] += 1
+
+        gone = ~int.from_bytes(seen, 'little') & ((1 << previous.count) - 1)
+        done = int.from_bytes(previous._done, 'little')
+        counts['confirmed_removed'] = bin(gone & done).count('1')
+        counts['failed_removed'] = bin(gone & ~done & int.from_bytes(previous._failed, 'little')).count('1')
+        counts['removed_elsewhere'] = bin(gone).count('1') - counts['confirmed_removed'] - counts['failed_removed']
+        self._mm.flush()
+        return counts
+
+    def replay_journal(self, journal: 'ProgressJournal') -> int:
+        """Mark items recorded in the journal after the last sync as done"""
+        recent = journal.load(self.journal_offset)
+        marked = 0
+        if recent:
+            for position in range(self.count):
+                if self._ids[position] in recent:
+                    self.mark_done(position)
+                    marked += 1
+        self.sync(journal.offset)
+        return marked
+
+    def sync(self, journal_offset: Optional[int] = None):
+        """Flush the mapping, recording how much of the journal it reflects"""
+        if journal_offset is not None:
+            self.journal_offset = journal_offset
+            struct.pack_into('=Q', self._mm, self.JOURNAL_OFFSET, journal_offset)
+        self._mm.flush()
+
+    def close(self):
+        """Release the mapping and close the file"""
+        if getattr(self, '_view', None) is not None:
+            for view in (self._ids, self._timestamps, self._authors, self._by_time, self._by_author,
+                         self._author_offsets, self._done, self._failed, self._view):
+                view.release()
+            self._view = None
+        if getattr(self, '_mm', None) is not None and not self._mm.closed:
+            self._mm.flush()
+            self._mm.close()
+        self._file.close()
+
+class WorkSelection:
+    """Filtered, reordered view of a WorkIndex queue
+
+    Walks its positions the way WorkIndex.next_pending walks the bitmaps,
+    skipping items that are done or failed. Marking still goes to the index.
+    """
+
+    def __init__(self, index: WorkIndex, positions: array):
+        self.index = index
+        self.positions = positions
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def cursor(self) -> int:
+        return self._cursor
+
+    def next_pending(self) -> Optional[int]:
+        index, positions = self.index, self.positions
+        while self._cursor < len(positions):
+            position = positions[self._cursor]
+            if not (index.is_done(position) or index.is_failed(position)):
+                return position
+            self._cursor += 1
+        return None
+
+    def done_count(self) -> int:
+        return sum(1 for position in self.positions if self.index.is_done(position))
+
+    def failed_count(self) -> int:
+        return sum(1 for position in self.positions if self.index.is_failed(position))
+
+    def processed_count(self) -> int:
+        return sum(1 for position in self.positions
+                   if self.index.is_done(position) or self.index.is_failed(position))
+
+class StateStore:
+    """Embedded SQLite store for accounts, counters, run history and work queues
+
+    Runs in WAL mode so menus can read while a run is writing, and every
+    update is a small transactional row change instead of a whole-file rewrite.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS accounts (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            delay_multiplier REAL NOT NULL DEFAULT 1.0,
+            total_unliked INTEGER NOT NULL DEFAULT 0,
+            last_run TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL REFERENCES accounts(username) ON DELETE CASCADE,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            unliked INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS runs_by_account ON runs(username, started_at);
+        CREATE TABLE IF NOT EXISTS queues (
+            username TEXT PRIMARY KEY REFERENCES accounts(username) ON DELETE CASCADE,
+            export_path TEXT NOT NULL,
+            index_path TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            cursor INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+        self._settings_cache: Dict[str, str] = {}
+
+    def _write(self, sql: str, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Settings
+
+    def load_settings(self) -> Dict[str, Any]:
+        """Return all stored settings"""
+        rows = self._conn.execute("SELECT key, value FROM settings").fetchall()
+        self._settings_cache = {row['key']: row['value'] for row in rows}
+        return {key: json.loads(value) for key, value in self._settings_cache.items()}
+
+    def save_settings(self, settings: Dict[str, Any]):
+        """Upsert only the settings whose value changed"""
+        changed = []
+        for key, value in settings.items():
+            encoded = json.dumps(value, sort_keys=True)
+            if self._settings_cache.get(key) != encoded:
+                changed.append((key, encoded))
+        if not changed:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", changed)
+        self._settings_cache.update(changed)
+
+    # Accounts
+
+    def add_account(self, username: str, password: str, created_at: Optional[str] = None,
+                    total_unliked: int = 0, last_run: Optional[str] = None,
+                    last_error: Optional[str] = None, enabled: bool = True,
+                    delay_multiplier: float = 1.0):
+        """Insert an account, or only update the password of an existing one
+
+        Updated in place rather than replaced: a replace deletes the row first,
+        which would cascade to the account's runs and queue.
+        """
+        self._write(
+            "INSERT INTO accounts (username, password, enabled, delay_multiplier, "
+            "total_unliked, last_run, last_error, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET password = excluded.password",
+            (username, password, int(enabled), delay_multiplier, total_unliked,
+             last_run, last_error, created_at or datetime.now().isoformat())
+        )
+
+    def remove_account(self, username: str):
+        self._write("DELETE FROM accounts WHERE username = ?", (username,))
+
+    def has_account(self, username: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM accounts WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def get_account(self, username: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT * FROM accounts WHERE username = ?", (username,)).fetchone()
+        return dict(row) if row else None
+
+    def list_accounts(self) -> List[str]:
+        return [row[0] for row in self._conn.execute("SELECT username FROM accounts ORDER BY username")]
+
+    def account_options(self) -> Dict[str, Dict[str, Any]]:
+        """Per-account run options in the shape of CONFIG['accounts']"""
+        rows = self._conn.execute("SELECT username, enabled, delay_multiplier FROM accounts")
+        return {
+            row['username']: {"enabled": bool(row['enabled']), "delay_multiplier": row['delay_multiplier']}
+            for row in rows
+        }
+
+    def save_account_options(self, options: Dict[str, Dict[str, Any]]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE accounts SET enabled = ?, delay_multiplier = ? WHERE username = ?",
+                [(int(opts.get('enabled', True)), opts.get('delay_multiplier', 1.0), username)
+                 for username, opts in options.items()]
+            )
+
+    def account_summaries(self) -> List[Dict[str, Any]]:
+        """All accounts with their queue progress, in one query"""
+        rows = self._conn.execute("""
+            SELECT a.username, a.total_unliked, a.last_run, a.last_error,
+                   q.total AS queue_total, q.done AS queue_done, q.failed AS queue_failed
+            FROM accounts a LEFT JOIN queues q ON q.username = a.username
+            ORDER BY a.username
+        """)
+        return [dict(row) for row in rows]
+
+    def totals(self) -> Dict[str, int]:
+        """Aggregate counters across all accounts"""
+        row = self._conn.execute("""
+            SELECT COUNT(*) AS accounts,
+                   COALESCE(SUM(total_unliked), 0) AS total_unliked,
+                   COALESCE(SUM(last_error IS NOT NULL), 0) AS with_errors
+            FROM accounts
+        """).fetchone()
+        return dict(row)
+
+    def set_last_error(self, username: str, error: Optional[str]):
+        self._write("UPDATE accounts SET last_error = ? WHERE username = ?", (error, username))
+
+    def migrate_legacy_accounts(self, accounts_dir: Path, options: Dict[str, Dict[str, Any]]) -> int:
+        """Import accounts/*.json files, renaming them so they are imported once"""
+        migrated = 0
+        for account_file in sorted(Path(accounts_dir).glob("*.json")):
+            try:
+                with open(account_file, 'r') as f:
+                    data = json.load(f)
+                username = data.get('username') or account_file.stem
+                if not self.has_account(username):
+                    opts = options.get(username, {})
+                    self.add_account(
+                        username, data['password'], data.get('created_at'),
+                        data.get('total_unliked', 0), data.get('last_run'), data.get('last_error'),
+                        opts.get('enabled', True), opts.get('delay_multiplier', 1.0)
+                    )
+                    migrated += 1
+                account_file.rename(account_file.with_suffix('.json.migrated'))
+            except (OSError, KeyError, json.JSONDecodeError) as e:
+                logging.warning(f"Could not migrate {account_file}: {str(e)}")
+        return migrated
+
+    # Runs and queues
+
+    def start_run(self, username: str) -> int:
+        cursor = self._write(
+            "INSERT INTO runs (username, started_at) VALUES (?, ?)",
+            (username, datetime.now().isoformat())
+        )
+        return cursor.lastrowid
+
+    def update_progress(self, run_id: int, username: str, unliked: int, failed: int,
+                        total_unliked: int, index: Optional['WorkIndex'] = None):
+        """Record run counters and queue position in one transaction"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET unliked = ?, failed = ? WHERE id = ?", (unliked, failed, run_id)
+            )
+            self._conn.execute(
+                "UPDATE accounts SET total_unliked = ? WHERE username = ?", (total_unliked, username)
+            )
+            if index is not None:
+                self._conn.execute(
+                    "UPDATE queues SET done = ?, failed = ?, cursor = ?, updated_at = ? WHERE username = ?",
+                    (index.done_count(), index.failed_count(), index.cursor, now, username)
+                )
+
+    def finish_run(self, run_id: int, username: str, status: str, error: Optional[str] = None):
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ?, status = ?, error = ? WHERE id = ?",
+                (now, status, error, run_id)
+            )
+            self._conn.execute(
+                "UPDATE accounts SET last_run = ?, last_error = ? WHERE username = ?",
+                (now, error, username)
+            )
+
+    def outcome_totals(self, username: str) -> Tuple[int, int]:
+        """Posts unliked and dead-lettered over all of an account's runs"""
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(unliked), 0), COALESCE(SUM(failed), 0) FROM runs WHERE username = ?",
+            (username,)
+        ).fetchone()
+        return row[0], row[1]
+
+    def recent_runs(self, username: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        if username is None:
+            rows = self._conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = self._conn.execute(
+                "SELECT * FROM runs WHERE username = ? ORDER BY id DESC LIMIT ?", (username, limit)
+            )
+        return [dict(row) for row in rows]
+
+    def save_queue(self, username: str, export_path: str, index: 'WorkIndex'):
+        self._write(
+            "INSERT OR REPLACE INTO queues (username, export_path, index_path, total, done, failed, "
+            "cursor, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (username, str(export_path), str(index.path), len(index), index.done_count(),
+             index.failed_count(), index.cursor, datetime.now().isoformat())
+        )
+
+THROTTLE_TOKENS = ('feedback_required', 'please wait a few minutes')  # Instagram sends these with a 400
+THROTTLE_MARKERS = ('rate limit', 'too many requests', 'throttl')
+# A status code in the message only counts next to "HTTP"/"status", or in requests' "404 Client Error"
+HTTP_STATUS_PATTERN = re.compile(r'\b(?:HTTP(?:/[\d.]+)?|status(?:[ _]code)?)\s*[:=]?\s*([1-5]\d\d)\b'
+                                 r'|\b([1-5]\d\d) (?:Client|Server) Error\b', re.IGNORECASE)
+
+def http_status_of(error: BaseException) -> Optional[int]:
+    """Best-effort HTTP status code carried by an ensta/requests exception
+
+    The status of an attached response wins; otherwise the message is
+    searched for a code in an HTTP-status context, so "timed out after
+    404 ms" is not a 404.
+    """
+    response = getattr(error, 'response', None)
+    for candidate in (getattr(response, 'status_code', None), getattr(error, 'status_code', None),
+                      getattr(error, 'status', None)):
+        if isinstance(candidate, int):
+            return candidate
+    match = HTTP_STATUS_PATTERN.search(str(error))
+    return int(match.group(1) or match.group(2)) if match else None
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if the exception carries one"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_throttle_error(error: BaseException) -> bool:
+    """Whether the server is telling us to slow down
+
+    Free-text markers are only trusted when no status code is known.
+    """
+    status = http_status_of(error)
+    if status == 429 or retry_after_of(error) is not None:
+        return True
+    message = str(error).lower()
+    if any(token in message for token in THROTTLE_TOKENS):
+        return True
+    return status is None and any(marker in message for marker in THROTTLE_MARKERS)
+
+def pacing_limits(delay_multiplier: float = 1.0) -> Tuple[float, float, float]:
+    """Floor, ceiling and starting interval for CONFIG's delay and pacing
+
+    Throttling may back off past delay.max, up to pacing.max_interval.
+    """
+    low = CONFIG['delay']['min'] * delay_multiplier
+    high = CONFIG['delay']['max'] * delay_multiplier
+    return low, max(high, CONFIG['pacing']['max_interval'] * delay_multiplier), (low + high) / 2
+
+class RateGovernor:
+    """Adaptive pacing for unlike calls: a token bucket tuned with AIMD
+
+    Tokens refill at one per interval, up to burst. Healthy responses shrink
+    the interval by a fixed step toward the configured minimum delay, while
+    throttling multiplies it and honours any Retry-After by holding all
+    requests until then.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, start_interval: Optional[float] = None,
+                 burst: float = 1, jitter: float = 0.5, speed_up_step: float = 1.0,
+                 slow_down_factor: float = 2.0, clock=time.monotonic):
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.interval = self.min_interval if start_interval is None else start_interval
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+        self.burst = max(1.0, burst)
+        self.jitter = max(0.0, jitter)
+        self.speed_up_step = speed_up_step
+        self.slow_down_factor = max(1.0, slow_down_factor)
+        self.clock = clock
+        self.tokens = self.burst
+        self.hold_until = 0.0
+        self._refilled_at = clock()
+
+    @classmethod
+    def from_config(cls, delay_multiplier: float = 1.0) -> 'RateGovernor':
+        """Build a governor from CONFIG['delay'] and CONFIG['pacing']"""
+        pacing = CONFIG['pacing']
+        low, high, start = pacing_limits(delay_multiplier)
+        return cls(
+            min_interval=low,
+            max_interval=high,
+            start_interval=start,
+            burst=pacing['burst'],
+            jitter=pacing['jitter'],
+            speed_up_step=pacing['speed_up_step'] * delay_multiplier,
+            slow_down_factor=pacing['slow_down_factor']
+        )
+
+    def _refill(self, now: float):
+        if self.interval > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) / self.interval)
+        else:
+            self.tokens = self.burst
+        self._refilled_at = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it"""
+        now = self.clock()
+        self._refill(now)
+        wait = (1 - self.tokens) * self.interval if self.tokens < 1 else 0.0
+        # Spread requests out so the spacing is never perfectly periodic
+        wait += random.uniform(0, self.jitter * self.interval)
+        wait = max(wait, self.hold_until - now)
+        self.tokens -= 1
+        return wait
+
+    def on_success(self):
+        """Additive increase of the request rate after a healthy response"""
+        previous = self.interval
+        self.interval = max(self.min_interval, self.interval - self.speed_up_step)
+        if self.interval != previous:
+            logging.debug(f"Pacing: healthy response, interval {previous:.1f}s -> {self.interval:.1f}s")
+            if self.interval == self.min_interval:
+                logging.info(f"Pacing: reached configured floor of {self.min_interval:.1f}s")
+
+    def on_throttle(self, retry_after: Optional[float] = None, reason: str = ''):
+        """Multiplicative decrease of the request rate after throttling"""
+        now = self.clock()
+        previous = self.interval
+        self.interval = min(self.max_interval, max(self.interval, 1.0) * self.slow_down_factor)
+        self.tokens = min(self.tokens, 0.0)
+        self._refilled_at = now
+        hold = max(retry_after or 0.0, self.interval)
+        self.hold_until = max(self.hold_until, now + hold)
+        detail = f" ({reason})" if reason else ''
+        after = f", Retry-After {retry_after:.0f}s" if retry_after is not None else ''
+        logging.warning(f"Pacing: throttled{detail}{after}; interval {previous:.1f}s -> "
+                        f"{self.interval:.1f}s, holding requests for {hold:.0f}s")
+
+    def update_limits(self, min_interval: float, max_interval: float):
+        """Apply new delay settings without losing the learned interval"""
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+
+class UnlikeRejected(Exception):
+    """An unlike call that returned a falsy result instead of raising
+
+    ensta's Web.unlike returns False rather than raising when the response
+    status is not "ok" or the body is not JSON, which includes HTML error and
+    throttle pages. The post is still liked.
+    """
+
+class ErrorKind:
+    PERMANENT = 'permanent'    # The post itself can never be unliked (deleted, invalid)
+    TRANSIENT = 'transient'    # Network trouble or server errors; worth retrying
+    RATE_LIMIT = 'rate_limit'  # The server wants us to slow down
+    AUTH = 'auth'              # The session needs a login or a challenge solved; stop the run
+
+AUTH_STATUSES = (401,)
+AUTH_TOKENS = ('checkpoint_required', 'challenge_required', 'login_required')
+PERMANENT_STATUSES = (400, 404, 410)
+PERMANENT_MARKERS = ('not found', 'does not exist', 'has been deleted', 'media_not_found', 'invalid media')
+
+def classify_error(error: BaseException) -> str:
+    """Sort an exception from an unlike call into an ErrorKind
+
+    Login challenges come back as a 400 too, so they are picked out by
+    Instagram's tokens before the status is looked at. Free-text markers
+    are only trusted when no status code is known.
+    """
+    if isinstance(error, UnlikeRejected):
+        return ErrorKind.TRANSIENT
+    status = http_status_of(error)
+    message = str(error).lower()
+    if status in AUTH_STATUSES or any(token in message for token in AUTH_TOKENS):
+        return ErrorKind.AUTH
+    if is_throttle_error(error):
+        return ErrorKind.RATE_LIMIT
+    if status in PERMANENT_STATUSES:
+        return ErrorKind.PERMANENT
+    if status is None and any(marker in message for marker in PERMANENT_MARKERS):
+        return ErrorKind.PERMANENT
+    return ErrorKind.TRANSIENT
+
+def backoff_delay(attempt: int, base: float, cap_factor: int = 32) -> float:
+    """Exponential backoff with equal jitter for the given retry attempt (1-based)"""
+    delay = min(base * cap_factor, base * (2 ** (attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def _binomial(rng: random.Random, n: int, p: float) -> int:
+    """Binomial draw: normal approximation when well spread, geometric gaps when sparse"""
+    if n <= 0 or p <= 0:
+        return 0
+    if p >= 1:
+        return n
+    variance = n * p * (1 - p)
+    if variance >= 9:
+        return min(n, max(0, round(rng.gauss(n * p, math.sqrt(variance)))))
+    log_q = math.log1p(-p)
+    count = position = 0
+    while True:
+        position += int(math.log(1.0 - rng.random()) / log_q) + 1
+        if position > n:
+            return count
+        count += 1
+
+class RunPlanner:
+    """Monte Carlo model of how long a queue takes to drain
+
+    Mirrors the run loop: each item waits for the governor's interval (or
+    the call latency, if longer) plus jitter, may be followed by a break,
+    and may fail and back off before it is dead-lettered. The interval
+    starts where the governor is and shrinks by speed_up_step toward the
+    floor, as it does on healthy responses. Server throttling is not
+    modelled.
+
+    A simulation does not draw per item. Break and failure counts are
+    binomial, and sums of many independent waits are drawn from the normal
+    distribution they converge to, so one simulation costs a few draws
+    however long the queue is. With numpy the simulations run as arrays.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, start_interval: Optional[float] = None,
+                 jitter: float = 0.5, speed_up_step: float = 1.0, break_min: float = 0.0,
+                 break_max: float = 0.0, break_probability: float = 0.0, failure_rate: float = 0.0,
+                 retry_cost: float = 0.0, latency: float = 1.0):
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.start_interval = (self.min_interval + self.max_interval) / 2 if start_interval is None else start_interval
+        self.jitter = max(0.0, jitter)
+        self.speed_up_step = speed_up_step
+        self.break_min = break_min
+        self.break_max = max(break_min, break_max)
+        self.break_probability = min(max(break_probability, 0.0), 1.0)
+        self.failure_rate = min(max(failure_rate, 0.0), 1.0)
+        self.retry_cost = max(0.0, retry_cost)  # Extra seconds a dead-lettered item spends backing off
+        self.latency = max(0.0, latency)
+
+    @classmethod
+    def from_config(cls, delay_multiplier: float = 1.0, **history) -> 'RunPlanner':
+        """Planner for the current CONFIG, matching RateGovernor.from_config
+
+        history supplies failure_rate, retry_cost and latency from past runs.
+        """
+        low, high, start = pacing_limits(delay_multiplier)
+        return cls(
+            min_interval=low,
+            max_interval=high,
+            start_interval=start,
+            jitter=CONFIG['pacing']['jitter'],
+            speed_up_step=CONFIG['pacing']['speed_up_step'] * delay_multiplier,
+            break_min=CONFIG['break']['min'],
+            break_max=CONFIG['break']['max'],
+            break_probability=CONFIG['break']['probability'],
+            **history
+        )
+
+    def _pacing_moments(self, items: int, interval: float) -> Tuple[float, float, float]:
+        """Fixed spacing total, and jitter mean and variance, for items calls"""
+        interval = max(interval, self.min_interval)
+        step = self.speed_up_step
+        if step > 0:
+            decaying = min(items, max(0, math.ceil((interval - self.min_interval) / step)))
+            floor = self.min_interval
+        else:
+            # The interval never moves, so every call is spaced the same
+            decaying, floor = 0, interval
+        spacing = jitter_sum = jitter_squares = 0.0
+        for i in range(decaying):
+            current = max(self.min_interval, interval - i * step)
+            spacing += max(current, self.latency)
+            jitter_sum += current
+            jitter_squares += current * current
+        rest = items - decaying
+        spacing += rest * max(floor, self.latency)
+        jitter_sum += rest * floor
+        jitter_squares += rest * floor * floor
+        return spacing, self.jitter * jitter_sum / 2, self.jitter ** 2 * jitter_squares / 12
+
+    def simulate(self, items: int, simulations: int = 2000, interval: Optional[float] = None,
+                 seed: Optional[int] = None) -> List[float]:
+        """Total seconds to process items, once per simulation"""
+        if items <= 0:
+            return [0.0] * simulations
+        spacing, jitter_mean, jitter_variance = self._pacing_moments(
+            items, self.start_interval if interval is None else interval
+        )
+        break_mean = (self.break_min + self.break_max) / 2
+        break_variance = (self.break_max - self.break_min) ** 2 / 12
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None:
+            rng = np.random.default_rng(seed)
+            failures = rng.binomial(items, self.failure_rate, simulations)
+            breaks = rng.binomial(items - failures, self.break_probability)
+            totals = spacing + rng.normal(jitter_mean, math.sqrt(jitter_variance), simulations).clip(0)
+            totals += (breaks * break_mean + rng.standard_normal(simulations)
+                       * np.sqrt(breaks * break_variance)).clip(0)
+            totals += failures * self.retry_cost
+            return totals.tolist()
+
+        rng = random.Random(seed)
+        jitter_sd = math.sqrt(jitter_variance)
+        totals = []
+        for _ in range(simulations):
+            failures = _binomial(rng, items, self.failure_rate)
+            breaks = _binomial(rng, items - failures, self.break_probability)
+            total = spacing + max(0.0, rng.gauss(jitter_mean, jitter_sd))
+            if breaks:
+                total += max(0.0, rng.gauss(breaks * break_mean, math.sqrt(breaks * break_variance)))
+            totals.append(total + failures * self.retry_cost)
+        return totals
+
+    def estimate(self, items: int, simulations: int = 2000, interval: Optional[float] = None,
+                 seed: Optional[int] = None) -> Dict[str, float]:
+        """Mean, P50 and P90 seconds to process items"""
+        totals = sorted(self.simulate(items, simulations, interval, seed))
+        return {
+            "mean": sum(totals) / len(totals),
+            "p50": totals[int(0.5 * (len(totals) - 1))],
+            "p90": totals[int(0.9 * (len(totals) - 1))]
+        }
+
+def format_duration(seconds: float) -> str:
+    """Compact duration such as 2d 3h, 4h 12m or 35s"""
+    seconds = int(round(seconds))
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+class DeadLetterQueue:
+    """JSON-lines file of posts that could not be unliked, with the reason"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def add(self, media_id: int, kind: str, reason: str, attempts: int = 1):
+        entry = {
+            "media_id": media_id,
+            "kind": kind,
+            "reason": reason,
+            "attempts": attempts,
+            "failed_at": datetime.now().isoformat()
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self) -> List[Dict[str, Any]]:
+        entries = []
+        if not self.path.exists():
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping malformed dead-letter line in {self.path}")
+        return entries
+
+    def replace(self, entries: List[Dict[str, Any]]):
+        """Atomically rewrite the queue with entries"""
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def archive(self) -> Optional[Path]:
+        """Move the current entries aside once they have been requeued"""
+        if not self.path.exists():
+            return None
+        target = self.path.with_name(f"{self.path.stem}.{datetime.now().strftime('%Y%m%d-%H%M%S')}.reprocessed")
+        self.path.rename(target)
+        return target
+
+class EnvironmentStamp:
+    """Records that the startup checks passed for this interpreter and package set
+
+    Installed versions are read from dist-info directory names, so checking
+    the stamp imports nothing.
+    """
+    PACKAGES = ('ensta', 'tqdm', 'psutil', 'pip')
+    DIST_INFO_PATTERN = re.compile(r'^([A-Za-z0-9_.]+)-([^-]+?)\.(?:dist|egg)-info$')
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    @classmethod
+    def fingerprint(cls) -> Dict[str, Any]:
+        versions = dict.fromkeys(cls.PACKAGES)
+        for entry in sys.path:
+            try:
+                names = os.listdir(entry or '.')
+            except OSError:
+                continue
+            for name in names:
+                match = cls.DIST_INFO_PATTERN.match(name)
+                if match:
+                    package = match.group(1).lower().replace('_', '-')
+                    # First hit wins, the same as the import system
+                    if package in versions and versions[package] is None:
+                        versions[package] = match.group(2)
+        return {"executable": sys.executable, "python": sys.version, "packages": versions}
+
+    def is_valid(self) -> bool:
+        try:
+            with open(self.path, 'r') as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return stamp.get('fingerprint') == self.fingerprint()
+
+    def save(self):
+        stamp = {"fingerprint": self.fingerprint(), "checked_at": datetime.now().isoformat()}
+        with open(self.path, 'w') as f:
+            json.dump(stamp, f, indent=4)
+
+    def invalidate(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+class SessionCache:
+    """Per-account login sessions kept on disk between runs
+
+    ensta writes the session cookies and CSRF token to the file it is given;
+    a small sidecar records when that session was created so stale sessions
+    expire instead of being replayed forever.
+    """
+
+    def __init__(self, directory: Path, max_age_days: float = 30):
+        self.directory = Path(directory)
+        self.max_age = timedelta(days=max_age_days)
+
+    def session_file(self, username: str) -> Path:
+        return self.directory / f"{username}.session"
+
+    def _meta_file(self, username: str) -> Path:
+        return self.directory / f"{username}.meta.json"
+
+    def is_fresh(self, username: str) -> bool:
+        """Whether a session exists for the account and has not expired"""
+        try:
+            with open(self._meta_file(username), 'r') as f:
+                saved_at = datetime.fromisoformat(json.load(f)['saved_at'])
+        except (OSError, KeyError, ValueError):
+            return False
+        return self.session_file(username).exists() and datetime.now() - saved_at < self.max_age
+
+    def mark_saved(self, username: str):
+        """Record that a freshly logged-in session was written for the account"""
+        self.directory.mkdir(exist_ok=True)
+        session_file = self.session_file(username)
+        if session_file.exists():
+            session_file.chmod(0o600)
+        meta_file = self._meta_file(username)
+        with open(meta_file, 'w') as f:
+            json.dump({"saved_at": datetime.now().isoformat()}, f)
+        meta_file.chmod(0o600)
+
+    def invalidate(self, username: str):
+        """Forget the cached session so the next login is a full one"""
+        for path in (self.session_file(username), self._meta_file(username)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+class AsyncInstagramClient:
+    """Async adapter around a blocking ensta client
+
+    Calls run on one dedicated worker thread, since the underlying requests
+    session is not safe to share between threads.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instagram")
+
+    async def _call(self, method: str, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(getattr(self.client, method), *args))
+
+    async def unlike(self, media_id: int):
+        return await self._call('unlike', media_id)
+
+    async def private_info(self):
+        return await self._call('private_info')
+
+    def close(self):
+        """Release the worker thread without waiting for an in-flight request"""
+        self._executor.shutdown(wait=False)
+
+class FakeInstagramError(Exception):
+    """HTTP error from FakeInstagramClient, shaped like a requests HTTPError"""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {message}")
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status, headers=headers)
+
+class FakeInstagramClient:
+    """Local stand-in for ensta.Web, for benchmarks and offline runs
+
+    Implements the calls the unliker makes (private_info and unlike) with a
+    fixed latency, randomly injected HTTP errors and an optional sliding-window
+    rate limit that answers 429 once exceeded. With errors_as_false, unlike
+    returns False instead of raising, as ensta.Web.unlike does for any
+    response that is not "ok" JSON.
+    """
+    ERROR_MESSAGES = {
+        400: "checkpoint_required",
+        404: "Media not found or unavailable",
+        429: "Please wait a few minutes before you try again.",
+        500: "Internal server error",
+        502: "Bad gateway",
+        503: "Service unavailable"
+    }
+
+    def __init__(self, username: str = 'fake', latency: float = 0.0,
+                 error_rates: Optional[Dict[int, float]] = None,
+                 rate_limit: Optional[Tuple[int, float]] = None, retry_after: Optional[float] = None,
+                 seed: Optional[int] = None, clock=time.monotonic, sleep=time.sleep,
+                 errors_as_false: bool = False):
+        self.username = username
+        self.latency = latency
+        self.error_rates = dict(error_rates or {})  # HTTP status -> probability per call
+        self.rate_limit = rate_limit  # (requests, window seconds)
+        self.retry_after = retry_after
+        self.errors_as_false = errors_as_false
+        self.rejected = 0  # Calls answered with False
+        self.clock = clock
+        self.sleep = sleep
+        self.calls = 0
+        self.unliked = set()
+        self._random = random.Random(seed)
+        self._recent = deque()
+
+    def private_info(self):
+        return SimpleNamespace(username=self.username)
+
+    def unlike(self, media_id: int) -> bool:
+        try:
+            return self._unlike(media_id)
+        except FakeInstagramError:
+            if not self.errors_as_false:
+                raise
+            self.rejected += 1
+            return False
+
+    def _unlike(self, media_id: int) -> bool:
+        self.calls += 1
+        if self.latency:
+            self.sleep(self.latency)
+        if self.rate_limit is not None:
+            limit, window = self.rate_limit
+            now = self.clock()
+            while self._recent and now - self._recent[0] >= window:
+                self._recent.popleft()
+            if len(self._recent) >= limit:
+                raise FakeInstagramError(429, self.ERROR_MESSAGES[429], self.retry_after)
+            self._recent.append(now)
+        roll = self._random.random()
+        for status, rate in self.error_rates.items():
+            if roll < rate:
+                raise FakeInstagramError(status, self.ERROR_MESSAGES.get(status, "Server error"),
+                                         self.retry_after if status == 429 else None)
+            roll -= rate
+        self.unliked.add(media_id)
+        return True
+
+class RunMetrics:
+    """Call counters, latency histograms and a wall-time breakdown per account
+
+    Updated by the run loop and its I/O thread and read by the metrics server,
+    so every access takes the lock. Wall time is split into network, pacing,
+    break, cooldown and io (writes that block the run loop); whatever is left
+    is reported as other. Journal and state store writes on the I/O thread
+    overlap those stages and are counted separately as background_io.
+    """
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    # RunHistory stores outcomes by position: append new ones at the end
+    OUTCOMES = ('success', 'retry', 'rate_limited', 'permanent_failure', 'retries_exhausted', 'auth_required')
+    STAGES = ('network', 'pacing', 'break', 'cooldown', 'paused', 'io')
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, Dict[str, Any]] = {}
+
+    def _account(self, username: str) -> Dict[str, Any]:
+        data = self._accounts.get(username)
+        if data is None:
+            data = self._accounts[username] = {
+                "calls": dict.fromkeys(self.OUTCOMES, 0),
+                "buckets": [0] * (len(self.LATENCY_BUCKETS) + 1),
+                "latency_sum": 0.0,
+                "latency_count": 0,
+                "time": dict.fromkeys(self.STAGES, 0.0),
+                "background_io": 0.0,
+                "wall": 0.0,
+                "run_started": None,
+                "queue": {"total": 0, "done": 0, "failed": 0, "pending": 0},
+                "pacing_interval": None
+            }
+        return data
+
+    def start_run(self, username: str):
+        with self._lock:
+            self._account(username)['run_started'] = self.clock()
+
+    def finish_run(self, username: str):
+        with self._lock:
+            data = self._account(username)
+            if data['run_started'] is not None:
+                data['wall'] += self.clock() - data['run_started']
+                data['run_started'] = None
+
+    def observe_call(self, username: str, seconds: float, outcome: str):
+        """Record one completed unlike call and the time spent waiting on it"""
+        slot = len(self.LATENCY_BUCKETS)
+        for i, bound in enumerate(self.LATENCY_BUCKETS):
+            if seconds <= bound:
+                slot = i
+                break
+        with self._lock:
+            data = self._account(username)
+            data['calls'][outcome] += 1
+            data['buckets'][slot] += 1
+            data['latency_sum'] += seconds
+            data['latency_count'] += 1
+            data['time']['network'] += seconds
+
+    def add_time(self, username: str, stage: str, seconds: float):
+        with self._lock:
+            self._account(username)['time'][stage] += seconds
+
+    def add_background_io(self, username: str, seconds: float):
+        with self._lock:
+            self._account(username)['background_io'] += seconds
+
+    def set_progress(self, username: str, total: int, done: int, failed: int,
+                     pacing_interval: Optional[float] = None):
+        with self._lock:
+            data = self._account(username)
+            data['queue'] = {"total": total, "done": done, "failed": failed,
+                             "pending": total - done - failed}
+            if pacing_interval is not None:
+                data['pacing_interval'] = pacing_interval
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict copy of every account's metrics"""
+        now = self.clock()
+        accounts = {}
+        with self._lock:
+            for username, data in self._accounts.items():
+                wall = data['wall']
+                if data['run_started'] is not None:
+                    wall += now - data['run_started']
+                time_spent = {stage: round(seconds, 6) for stage, seconds in data['time'].items()}
+                time_spent['other'] = round(max(0.0, wall - sum(data['time'].values())), 6)
+                cumulative = list(itertools.accumulate(data['buckets']))
+                buckets = {str(bound): count for bound, count in zip(self.LATENCY_BUCKETS, cumulative)}
+                buckets['+Inf'] = cumulative[-1]
+                count = data['latency_count']
+                accounts[username] = {
+                    "running": data['run_started'] is not None,
+                    "calls": dict(data['calls']),
+                    "latency": {
+                        "buckets": buckets,
+                        "sum": round(data['latency_sum'], 6),
+                        "count": count,
+                        "mean": round(data['latency_sum'] / count, 6) if count else None
+                    },
+                    "time_seconds": time_spent,
+                    "wall_seconds": round(wall, 6),
+                    "background_io_seconds": round(data['background_io'], 6),
+                    "queue": dict(data['queue']),
+                    "pacing_interval": data['pacing_interval']
+                }
+        return {"generated_at": datetime.now().isoformat(timespec='seconds'), "accounts": accounts}
+
+    def write_snapshot(self, path):
+        """Atomically replace path with the JSON snapshot"""
+        path = Path(path)
+        temp = path.with_name(path.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp, path)
+
+    def render_prometheus(self) -> str:
+        """Snapshot in the Prometheus text exposition format"""
+        def label(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        families = {
+            'unliker_unlike_calls_total': ('counter', 'Completed unlike calls by outcome', []),
+            'unliker_unlike_latency_seconds': ('histogram', 'Latency of unlike calls', []),
+            'unliker_time_seconds_total': ('counter', 'Wall time of runs by stage', []),
+            'unliker_background_io_seconds_total': ('counter', 'Journal and state writes on the I/O thread', []),
+            'unliker_run_seconds_total': ('counter', 'Wall time spent in runs', []),
+            'unliker_running': ('gauge', 'Whether a run is in progress', []),
+            'unliker_queue_items': ('gauge', 'Work queue items by state', []),
+            'unliker_pacing_interval_seconds': ('gauge', 'Current interval between unlike calls', [])
+        }
+        for username, data in self.snapshot()['accounts'].items():
+            account = f'account="{label(username)}"'
+            for outcome, count in data['calls'].items():
+                families['unliker_unlike_calls_total'][2].append(f'{{{account},outcome="{outcome}"}} {count}')
+            latency = families['unliker_unlike_latency_seconds'][2]
+            for bound, count in data['latency']['buckets'].items():
+                latency.append(f'_bucket{{{account},le="{bound}"}} {count}')
+            latency.append(f'_sum{{{account}}} {data["latency"]["sum"]}')
+            latency.append(f'_count{{{account}}} {data["latency"]["count"]}')
+            for stage, seconds in data['time_seconds'].items():
+                families['unliker_time_seconds_total'][2].append(f'{{{account},stage="{stage}"}} {seconds}')
+            families['unliker_background_io_seconds_total'][2].append(f'{{{account}}} {data["background_io_seconds"]}')
+            families['unliker_run_seconds_total'][2].append(f'{{{account}}} {data["wall_seconds"]}')
+            families['unliker_running'][2].append(f'{{{account}}} {int(data["running"])}')
+            for state in ('pending', 'done', 'failed'):
+                families['unliker_queue_items'][2].append(f'{{{account},state="{state}"}} {data["queue"][state]}')
+            if data['pacing_interval'] is not None:
+                families['unliker_pacing_interval_seconds'][2].append(f'{{{account}}} {data["pacing_interval"]}')
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(name + sample for sample in samples)
+        return '\n'.join(lines) + '\n'
+
+class RunHistory:
+    """Append-only, columnar log of every unlike call for one account
+
+    The file is a sequence of blocks: a 32 byte header (magic, event count,
+    run ID, first and last timestamp) followed by the block's columns, which
+    are float64 Unix timestamps, uint64 media IDs, float32 call latencies,
+    float32 waits since the previous call and uint8 outcomes (indexes into
+    RunMetrics.OUTCOMES). Events are buffered and appended a block at a time;
+    a crash loses at most the unwritten tail and a torn last block is ignored
+    when reading. Blocks outside a requested time range are skipped by their
+    header alone.
+    """
+    MAGIC = b'IGEV'
+    BLOCK = struct.Struct('=4sIIdd4x')  # magic, count, run ID, first timestamp, last timestamp
+    BLOCK_SIZE = 4096  # Events per block, unless a flush is forced or overdue
+    OUTCOMES = {outcome: number for number, outcome in enumerate(RunMetrics.OUTCOMES)}
+
+    def __init__(self, path: Path, run_id: int = 0, flush_interval: float = 600):
+        self.path = Path(path)
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()  # record() runs on the loop, flush() on the I/O thread
+        self._last_flush = time.monotonic()
+        self._reset()
+
+    def _reset(self):
+        self._timestamps = array('d')
+        self._media_ids = array('Q')
+        self._latencies = array('f')
+        self._waits = array('f')
+        self._outcomes = array('B')
+
+    def record(self, timestamp: float, media_id: int, outcome: str, latency: float, wait: float):
+        with self._lock:
+            self._timestamps.append(timestamp)
+            self._media_ids.append(media_id)
+            self._latencies.append(latency)
+            self._waits.append(wait)
+            self._outcomes.append(self.OUTCOMES[outcome])
+
+    def flush(self, force: bool = False):
+        """Append the buffered events as one block once enough have built up"""
+        with self._lock:
+            count = len(self._timestamps)
+            if not count or not (force or count >= self.BLOCK_SIZE
+                                 or time.monotonic() - self._last_flush >= self.flush_interval):
+                return
+            columns = (self._timestamps, self._media_ids, self._latencies, self._waits, self._outcomes)
+            self._reset()
+            self._last_flush = time.monotonic()
+        timestamps = columns[0]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(self.BLOCK.pack(self.MAGIC, count, self.run_id, timestamps[0], timestamps[-1]))
+            for column in columns:
+                column.tofile(f)
+
+    def blocks(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Tuple[array, ...]]:
+        """Yield (timestamps, media_ids, latencies, waits, outcomes) per block in [since, until)"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            while True:
+                header = f.read(self.BLOCK.size)
+                if len(header) < self.BLOCK.size:
+                    return
+                magic, count, _, first, last = self.BLOCK.unpack(header)
+                if magic != self.MAGIC:
+                    logging.warning(f"Run history {self.path} is corrupt; ignoring the rest")
+                    return
+                size = 25 * count
+                if (since is not None and last < since) or (until is not None and first >= until):
+                    f.seek(size, os.SEEK_CUR)
+                    continue
+                data = f.read(size)
+                if len(data) < size:
+                    return  # Torn block from a crash
+                columns = []
+                offset = 0
+                for typecode in ('d', 'Q', 'f', 'f', 'B'):
+                    column = array(typecode)
+                    end = offset + column.itemsize * count
+                    column.frombytes(data[offset:end])
+                    columns.append(column)
+                    offset = end
+                lo = bisect.bisect_left(columns[0], since) if since is not None and first < since else 0
+                hi = bisect.bisect_left(columns[0], until) if until is not None and last >= until else count
+                if lo or hi < count:
+                    columns = [column[lo:hi] for column in columns]
+                yield tuple(columns)
+
+    def report(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """Throughput, error rates and pacing efficiency over [since, until)
+
+        Pacing efficiency is the share of paced time (waits plus calls) that
+        went into successful unlikes rather than failures, retries and
+        rate-limit cooldowns. Hours are local time.
+        """
+        success = self.OUTCOMES['success']
+        rate_limited = self.OUTCOMES['rate_limited']
+        is_success = bytes(int(number == success) for number in range(256))
+        calls: Dict[Tuple[int, int], int] = Counter()  # (hour, outcome) -> calls
+        latency = wait = productive = 0.0
+        for timestamps, _, latencies, waits, outcomes in self.blocks(since, until):
+            calls.update(zip([int(timestamp // 3600) for timestamp in timestamps], outcomes))
+            mask = outcomes.tobytes().translate(is_success)
+            latency += sum(latencies)
+            wait += sum(waits)
+            productive += sum(itertools.compress(latencies, mask)) + sum(itertools.compress(waits, mask))
+
+        hourly: Dict[int, Dict[str, int]] = {}
+        by_outcome = dict.fromkeys(RunMetrics.OUTCOMES, 0)
+        for (hour, outcome), count in calls.items():
+            row = hourly.setdefault(hour, {"calls": 0, "unliked": 0, "errors": 0, "rate_limited": 0})
+            row['calls'] += count
+            if outcome == success:
+                row['unliked'] += count
+            else:
+                row['errors'] += count
+                if outcome == rate_limited:
+                    row['rate_limited'] += count
+            by_outcome[RunMetrics.OUTCOMES[outcome]] += count
+
+        hour_of_day = [{"hour": hour, "calls": 0, "unliked": 0, "errors": 0} for hour in range(24)]
+        timeline = []
+        for hour in sorted(hourly):
+            start = datetime.fromtimestamp(hour * 3600)
+            row = hourly[hour]
+            timeline.append({"hour": start.isoformat(timespec='minutes'), **row})
+            totals = hour_of_day[start.hour]
+            for key in ('calls', 'unliked', 'errors'):
+                totals[key] += row[key]
+        for totals in hour_of_day:
+            totals['error_rate'] = round(totals['errors'] / totals['calls'], 4) if totals['calls'] else None
+
+        events = sum(by_outcome.values())
+        unliked = by_outcome['success']
+        peak = max(timeline, key=lambda row: row['unliked'], default=None)
+        return {
+            "since": datetime.fromtimestamp(since).isoformat(timespec='seconds') if since is not None else None,
+            "until": datetime.fromtimestamp(until).isoformat(timespec='seconds') if until is not None else None,
+            "events": events,
+            "unliked": unliked,
+            "outcomes": by_outcome,
+            "error_rate": round((events - unliked) / events, 4) if events else None,
+            "active_hours": len(timeline),
+            "unliked_per_active_hour": round(unliked / len(timeline), 1) if timeline else None,
+            "peak_hour": {"hour": peak['hour'], "unliked": peak['unliked']} if peak else None,
+            "latency_mean": round(latency / events, 3) if events else None,
+            "wait_mean": round(wait / events, 3) if events else None,
+            "pacing_efficiency": round(productive / (latency + wait), 4) if latency + wait else None,
+            "hourly": timeline,
+            "hour_of_day": hour_of_day
+        }
+
+class ProfileSpan:
+    """One timed entry of a profiler span; records its time under the full stack on exit"""
+    __slots__ = ('profiler', 'name', 'stack', 'started')
+
+    def __init__(self, profiler: 'RunProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        stack.append(self.name)
+        self.stack = ';'.join(stack)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        self.profiler._stack().pop()
+        self.profiler._add(self.stack, elapsed)
+
+_NULL_SPAN = contextlib.nullcontext()
+
+class RunProfiler:
+    """Named timing spans for one run, with optional cProfile and tracemalloc snapshots
+
+    Spans nest per thread and are recorded under their full stack, e.g.
+    main;engine;network. A disabled profiler hands out a shared no-op context,
+    so the hooks cost next to nothing on normal runs. With cprofile or
+    tracemalloc, snapshots are written every interval seconds from tick() and
+    once more from close(). Span and cProfile stacks are also written in the
+    collapsed format read by flamegraph.pl, inferno and speedscope.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, cprofile: bool = False,
+                 tracemalloc: bool = False, interval: float = 60):
+        self.directory = Path(directory) if directory is not None else None
+        self.enabled = directory is not None
+        self.interval = interval
+        self._spans: Dict[str, List[float]] = {}  # Stack -> [count, total seconds, max seconds]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._snapshots = 0
+        self._snapshot_at = time.monotonic()
+        self._cprofile = None
+        self._tracemalloc = None
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if cprofile:
+                import cProfile
+                self._cprofile = cProfile.Profile()
+                self._cprofile.enable()
+            if tracemalloc:
+                import tracemalloc as tracemalloc_module
+                self._tracemalloc = tracemalloc_module
+                tracemalloc_module.start(25)
+
+    def span(self, name: str):
+        """Context manager timing name under the current thread's open spans"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return ProfileSpan(self, name)
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            thread = threading.current_thread()
+            stack = self._local.stack = [
+                'main' if thread is threading.main_thread() else thread.name.rsplit('_', 1)[0]
+            ]
+        return stack
+
+    def _add(self, stack: str, elapsed: float):
+        with self._lock:
+            entry = self._spans.get(stack)
+            if entry is None:
+                self._spans[stack] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+
+    def spans(self) -> List[Dict[str, Any]]:
+        """Totals per span stack, with self time excluding nested spans, slowest first"""
+        with self._lock:
+            spans = {stack: list(entry) for stack, entry in self._spans.items()}
+        nested = dict.fromkeys(spans, 0.0)
+        for stack, (_, total, _) in spans.items():
+            parent = stack.rpartition(';')[0]
+            if parent in nested:
+                nested[parent] += total
+        rows = [{"stack": stack, "count": count, "total": total, "self": max(0.0, total - nested[stack]),
+                 "mean": total / count, "max": longest}
+                for stack, (count, total, longest) in spans.items()]
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def tick(self):
+        """Write cProfile and tracemalloc snapshots when the interval has passed"""
+        if (self._cprofile is not None or self._tracemalloc is not None) and \
+                time.monotonic() - self._snapshot_at >= self.interval:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the cProfile stats and tracemalloc snapshot collected so far"""
+        self._snapshot_at = time.monotonic()
+        self._snapshots += 1
+        # Memory first, so the cProfile dump's own allocations are not in it
+        if self._tracemalloc is not None and self._tracemalloc.is_tracing():
+            snapshot = self._tracemalloc.take_snapshot().filter_traces(
+                [self._tracemalloc.Filter(False, self._tracemalloc.__file__)]
+            )
+            snapshot.dump(str(self.directory / f"memory-{self._snapshots:03d}.tracemalloc"))
+            current, peak = self._tracemalloc.get_traced_memory()
+            with open(self.directory / f"memory-{self._snapshots:03d}.txt", 'w', encoding='utf-8') as f:
+                f.write(f"traced: {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+                for stat in snapshot.statistics('lineno')[:30]:
+                    f.write(f"{stat}\n")
+        if self._cprofile is not None:
+            # dump_stats() stops the profiler, so it is switched back on afterwards
+            self._cprofile.dump_stats(str(self.directory / f"cprofile-{self._snapshots:03d}.prof"))
+            self._cprofile.enable()
+
+    @staticmethod
+    def collapse_cprofile(stats: Dict[tuple, tuple]) -> Dict[str, int]:
+        """Collapsed stacks (microseconds of own time) from pstats data
+
+        cProfile only keeps caller edges, so each function's own time is put on
+        the path through its most expensive caller at every level.
+        """
+        def label(function) -> str:
+            filename, line, name = function
+            return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+        folded: Dict[str, int] = {}
+        for function, (_, _, own, _, callers) in stats.items():
+            if own <= 0:
+                continue
+            path = [function]
+            while callers:
+                parent = max(callers, key=lambda caller: callers[caller][3])
+                if parent in path or parent not in stats:
+                    break
+                path.append(parent)
+                callers = stats[parent][4]
+            stack = ';'.join(label(frame) for frame in reversed(path))
+            folded[stack] = folded.get(stack, 0) + round(own * 1e6)
+        return folded
+
+    def close(self) -> Optional[Path]:
+        """Write the final snapshots and span reports; returns the output directory"""
+        if not self.enabled:
+            return None
+        if self._cprofile is not None or self._tracemalloc is not None:
+            self.snapshot()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            import pstats
+            folded = self.collapse_cprofile(pstats.Stats(self._cprofile).stats)
+            with open(self.directory / "cprofile.folded", 'w', encoding='utf-8') as f:
+                f.writelines(f"{stack} {value}\n" for stack, value in sorted(folded.items()) if value)
+            self._cprofile = None
+        if self._tracemalloc is not None:
+            self._tracemalloc.stop()
+            self._tracemalloc = None
+
+        rows = self.spans()
+        # Shares are of the main thread's time; I/O thread spans overlap it
+        wall = sum(row['total'] for row in rows
+                   if row['stack'].startswith('main;') and row['stack'].count(';') == 1) or 1.0
+        with open(self.directory / "spans.folded", 'w', encoding='utf-8') as f:
+            f.writelines(f"{row['stack']} {round(row['self'] * 1e6)}\n"
+                         for row in sorted(rows, key=lambda row: row['stack']) if row['self'] >= 1e-6)
+        with open(self.directory / "spans.txt", 'w', encoding='utf-8') as f:
+            f.write(f"{'span':<40} {'count':>9} {'total s':>10} {'self s':>10} {'mean ms':>9} "
+                    f"{'max ms':>9} {'share':>6}\n")
+            for row in rows:
+                f.write(f"{row['stack']:<40} {row['count']:>9} {row['total']:>10.3f} {row['self']:>10.3f} "
+                        f"{row['mean'] * 1000:>9.3f} {row['max'] * 1000:>9.1f} {row['total'] / wall:>6.1%}\n")
+        self.enabled = False
+        return self.directory
+
+class MetricsServer:
+    """Serves RunMetrics on localhost: Prometheus text on /metrics, JSON on /metrics.json"""
+
+    def __init__(self, metrics: RunMetrics, port: int, host: str = '127.0.0.1'):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self) -> 'MetricsServer':
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = metrics.render_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body = json.dumps(metrics.snapshot()).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would otherwise flood the console
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class ControlServer:
+    """Unix-socket control plane for a running UnlikeEngine
+
+    Speaks JSON lines: each request is an object with a "command" (status,
+    pause, resume, drain or set) and gets one JSON object back. It runs on
+    the engine's event loop, so commands never race the run loop.
+    """
+    COMMANDS = ('status', 'pause', 'resume', 'drain', 'set')
+
+    def __init__(self, engine: 'UnlikeEngine', path: Path):
+        self.engine = engine
+        self.path = Path(path)
+        self._server = None
+
+    @staticmethod
+    def supported() -> bool:
+        return hasattr(asyncio, 'start_unix_server')
+
+    async def start(self) -> bool:
+        """Listen on the socket; False if another run already owns it"""
+        if self.path.exists():
+            try:
+                _, writer = await asyncio.open_unix_connection(str(self.path))
+                writer.close()
+                logging.warning(f"Another run is listening on {self.path}; control socket disabled")
+                return False
+            except OSError:
+                self.path.unlink()  # Left behind by a run that crashed
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._serve, path=str(self.path))
+        self.path.chmod(0o600)
+        logging.info(f"Control socket listening on {self.path}")
+        return True
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(self.handle(line)).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def handle(self, line: bytes) -> Dict[str, Any]:
+        try:
+            request = json.loads(line)
+            command = request.get('command') if isinstance(request, dict) else None
+            if command not in self.COMMANDS:
+                raise ValueError(f"Unknown command {command!r}; expected one of {', '.join(self.COMMANDS)}")
+            logging.info(f"Control: {command}")
+            engine = self.engine
+            if command == 'pause':
+                engine.pause()
+            elif command == 'resume':
+                engine.resume()
+            elif command == 'drain':
+                engine.drain()
+            elif command == 'set':
+                engine.apply_settings(request.get('settings') or {})
+            return {"ok": True, "status": engine.status()}
+        except (ValueError, TypeError) as e:
+            return {"ok": False, "error": str(e)}
+
+def control_request(path: Path, command: str, timeout: float = 10, **fields) -> Dict[str, Any]:
+    """Send one command to a running engine's control socket and return its reply"""
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(json.dumps(dict(fields, command=command)).encode('utf-8') + b'\n')
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply)
+
+class UnlikeEngine:
+    """asyncio run loop that unlikes the pending items of a work index
+
+    Every wait is a cancellable await on the stop event, so a shutdown request
+    ends delays, breaks and backoffs immediately. A drain request stops the
+    same way but lets an unlike call in flight finish first. Journal syncs and state
+    store updates run on a separate I/O thread while the loop moves on to the
+    next delay and network call. Posts that fail permanently, or keep failing
+    transiently, are marked failed and written to the dead-letter queue. A
+    login challenge stops the run and leaves the post pending.
+    Call outcomes and time spent per stage go to metrics. With a planner,
+    the progress display shows its P50/P90 estimate for the rest of the queue.
+    A selection limits the run to its posts, in its order. With a
+    control_path, a ControlServer on that socket can pause, resume, drain,
+    query and retune the run. With a history, every completed call is
+    appended to it with its latency and the wait before it. A profiler
+    times each stage of the loop and of the background writes in spans.
+    """
+    ETA_INTERVAL = 10  # Seconds between planner estimates
+    SETTABLE = {'delay': ('min', 'max'), 'break': ('min', 'max', 'probability')}
+
+    def __init__(self, username: str, account_data: Dict[str, Any], client: AsyncInstagramClient,
+                 index: WorkIndex, journal: ProgressJournal, store: StateStore, run_id: int,
+                 dead_letters: DeadLetterQueue, progress_bar=None, metrics: Optional[RunMetrics] = None,
+                 planner: Optional[RunPlanner] = None, selection: Optional[WorkSelection] = None,
+                 control_path: Optional[Path] = None, history: Optional[RunHistory] = None,
+                 profiler: Optional[RunProfiler] = None):
+        self.username = username
+        self.account_data = account_data
+        self.client = client
+        self.index = index
+        self.journal = journal
+        self.store = store
+        self.run_id = run_id
+        self.dead_letters = dead_letters
+        self.progress_bar = progress_bar
+        self.unliked = 0
+        self.failed = 0
+        self.delay_multiplier = CONFIG['accounts'].get(username, {}).get('delay_multiplier', 1.0)
+        self.governor = RateGovernor.from_config(self.delay_multiplier)
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.snapshot_path = CONFIG['metrics']['snapshot_path'] or None
+        self.snapshot_interval = CONFIG['metrics']['snapshot_interval']
+        self._snapshot_at = time.monotonic()
+        self.queue = selection if selection is not None else index
+        self._done_before = self.queue.done_count()
+        self._failed_before = self.queue.failed_count()
+        self.planner = planner
+        self._eta_at = None
+        self.control_path = control_path
+        self.history = history
+        self.profiler = profiler if profiler is not None else RunProfiler()
+        self._call_ended = time.monotonic()  # When the previous call returned
+        self._paused_for = 0.0  # Time paused since then, which is not pacing
+        self.draining = False
+        self._next_action: Tuple[str, Optional[float]] = ('starting', None)  # Stage and monotonic deadline
+        self._stop: Optional[asyncio.Event] = None
+        self._resumed: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._io_tasks: set = set()
+        journal.on_flush = self._on_flush
+
+    def _on_flush(self, offset: int):
+        # Runs on the I/O thread once a journal group is on disk
+        with self.profiler.span('index_sync'):
+            self.index.sync(offset)
+        with self.profiler.span('state'):
+            self.store.update_progress(self.run_id, self.username, self.unliked, self.failed,
+                                       self.account_data['total_unliked'], self.index)
+
+    def stop(self):
+        """Request a shutdown; safe to call from signal handlers and other threads"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop is not None and self._stop.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return self._resumed is not None and not self._resumed.is_set()
+
+    def pause(self):
+        """Hold the next unlike call until resume(); waits already running carry on"""
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def drain(self):
+        """Stop after the unlike call in flight, if any, has finished and been recorded"""
+        self.draining = True
+        self._stop.set()
+
+    def apply_settings(self, settings: Dict[str, Dict[str, float]]):
+        """Change delay and break settings for this run and later ones
+
+        The new values are saved to the state store right away. The governor
+        keeps its learned interval, clamped to the new limits.
+        """
+        updated = {section: dict(CONFIG[section]) for section in self.SETTABLE}
+        if not isinstance(settings, dict):
+            raise ValueError("settings must be an object")
+        for section, values in settings.items():
+            if section not in self.SETTABLE or not isinstance(values, dict):
+                raise ValueError(f"Cannot set {section!r}; settable: {', '.join(self.SETTABLE)}")
+            for key, value in values.items():
+                if key not in self.SETTABLE[section]:
+                    raise ValueError(f"Cannot set {section}.{key}; settable: {', '.join(self.SETTABLE[section])}")
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                    raise ValueError(f"{section}.{key} must be a non-negative number")
+                updated[section][key] = value
+        for section in self.SETTABLE:
+            if updated[section]['min'] > updated[section]['max']:
+                raise ValueError(f"{section}.min must not exceed {section}.max")
+        if updated['break']['probability'] > 1:
+            raise ValueError("break.probability must be at most 1")
+
+        CONFIG.update(updated)
+        self.store.save_settings(updated)
+        multiplier = self.delay_multiplier
+        low, high, _ = pacing_limits(multiplier)
+        self.governor.update_limits(low, high)
+        if self.planner is not None:
+            planner = self.planner
+            self.planner = RunPlanner.from_config(multiplier, failure_rate=planner.failure_rate,
+                                                  retry_cost=planner.retry_cost, latency=planner.latency)
+            self._eta_at = None
+        logging.info(f"Applied settings: delay {CONFIG['delay']}, break {CONFIG['break']}")
+
+    def status(self) -> Dict[str, Any]:
+        """Queue position, pacing and the next scheduled action"""
+        stage, deadline = self._next_action
+        wait = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        done = self._done_before + self.unliked
+        failed = self._failed_before + self.failed
+        if self.draining:
+            state = 'draining'
+        elif self.stopping:
+            state = 'stopping'
+        else:
+            state = 'paused' if self.paused else 'running'
+        return {
+            "account": self.username,
+            "run_id": self.run_id,
+            "state": state,
+            "queue": {"total": len(self.queue), "done": done, "failed": failed,
+                      "pending": len(self.queue) - done - failed, "cursor": self.queue.cursor},
+            "pacing": {
+                "interval": round(self.governor.interval, 3),
+                "min_interval": self.governor.min_interval,
+                "max_interval": self.governor.max_interval,
+                "held_for": round(max(0.0, self.governor.hold_until - self.governor.clock()), 1)
+            },
+            "next_action": {
+                "waiting_for": 'paused' if self.paused and stage != 'network' else stage,
+                "in_seconds": round(wait, 1) if wait is not None else None,
+                "at": (datetime.now() + timedelta(seconds=wait)).isoformat(timespec='seconds')
+                      if wait is not None else None
+            },
+            "settings": {section: CONFIG[section] for section in self.SETTABLE}
+        }
+
+    async def sleep(self, seconds: float, stage: str = 'pacing') -> bool:
+        """Wait for the given time; returns False if interrupted by a stop request
+
+        The time actually waited is added to the given metrics stage.
+        """
+        if self.stopping:
+            return False
+        if seconds <= 0:
+            return True
+        started = time.monotonic()
+        self._next_action = (stage, started + seconds)
+        try:
+            with self.profiler.span(stage):
+                await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+            return False
+        except asyncio.TimeoutError:
+            return True
+        finally:
+            self.metrics.add_time(self.username, stage, time.monotonic() - started)
+
+    def _in_background(self, func):
+        future = self._loop.run_in_executor(self._io, func)
+        self._io_tasks.add(future)
+        future.add_done_callback(self._io_tasks.discard)
+
+    def _flush_in_background(self):
+        self._in_background(self._timed_flush)
+
+    def _timed_flush(self):
+        # Runs on the I/O thread, overlapping the run loop
+        started = time.monotonic()
+        with self.profiler.span('flush'):
+            with self.profiler.span('journal'):
+                self.journal.flush()
+            if self.history is not None:
+                with self.profiler.span('history'):
+                    self.history.flush()
+        self.metrics.add_background_io(self.username, time.monotonic() - started)
+
+    def _update_metrics(self):
+        self.profiler.tick()
+        self.metrics.set_progress(self.username, len(self.queue), self._done_before + self.unliked,
+                                  self._failed_before + self.failed, self.governor.interval)
+        if self.planner is not None and self.progress_bar is not None and (
+                self._eta_at is None or time.monotonic() - self._eta_at >= self.ETA_INTERVAL):
+            self._eta_at = time.monotonic()
+            with self.profiler.span('eta'):
+                self._update_eta()
+        if self.snapshot_path and time.monotonic() - self._snapshot_at >= self.snapshot_interval:
+            self._snapshot_at = time.monotonic()
+            self._in_background(self._write_snapshot)
+
+    def _update_eta(self):
+        remaining = len(self.queue) - self._done_before - self.unliked - self._failed_before - self.failed
+        eta = self.planner.estimate(remaining, simulations=500, interval=self.governor.interval)
+        if isinstance(self.progress_bar, JsonProgress):
+            self.progress_bar.eta = eta
+        else:
+            self.progress_bar.set_postfix_str(
+                f"ETA {format_duration(eta['p50'])}, P90 {format_duration(eta['p90'])}", refresh=False
+            )
+
+    def _write_snapshot(self):
+        try:
+            self.metrics.write_snapshot(self.snapshot_path)
+        except OSError as e:
+            logging.warning(f"Could not write metrics snapshot to {self.snapshot_path}: {str(e)}")
+
+    def _install_signal_handlers(self) -> Dict[int, Any]:
+        previous = {}
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous[signum] = signal.getsignal(signum)
+            try:
+                self._loop.add_signal_handler(signum, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows event loops have no add_signal_handler
+                signal.signal(signum, lambda *_: self.stop())
+        return previous
+
+    def _restore_signal_handlers(self, previous: Dict[int, Any]):
+        for signum, handler in previous.items():
+            try:
+                self._loop.remove_signal_handler(signum)
+            except (NotImplementedError, RuntimeError):
+                pass
+            signal.signal(signum, handler)
+
+    async def _wait_while_paused(self) -> bool:
+        """Hold while paused; returns False if a stop request came first"""
+        if self.paused and not self.stopping:
+            started = time.monotonic()
+            self._next_action = ('paused', None)
+            logging.info("Paused")
+            resumed = asyncio.ensure_future(self._resumed.wait())
+            stopped = asyncio.ensure_future(self._stop.wait())
+            with self.profiler.span('paused'):
+                await asyncio.wait({resumed, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            resumed.cancel()
+            stopped.cancel()
+            self._paused_for += time.monotonic() - started
+            self.metrics.add_time(self.username, 'paused', time.monotonic() - started)
+            if not self.stopping:
+                logging.info("Resumed")
+        return not self.stopping
+
+    async def run(self) -> str:
+        """Process the queue; returns 'completed', 'stopped' or 'challenged'"""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        previous = self._install_signal_handlers()
+        control = None
+        if self.control_path is not None and ControlServer.supported():
+            control = ControlServer(self, self.control_path)
+            try:
+                if not await control.start():
+                    control = None
+            except OSError as e:
+                logging.warning(f"Could not open control socket {self.control_path}: {str(e)}")
+                control = None
+        self.metrics.start_run(self.username)
+        self._call_ended = time.monotonic()
+        self._update_metrics()
+        try:
+            return await self._process()
+        finally:
+            if control is not None:
+                await control.close()
+            self._restore_signal_handlers(previous)
+            started = time.monotonic()
+            if self._io_tasks:
+                await asyncio.gather(*self._io_tasks, return_exceptions=True)
+            self._io.shutdown(wait=True)
+            if self.history is not None:
+                self.history.flush(force=True)
+            self.metrics.add_time(self.username, 'io', time.monotonic() - started)
+            self.metrics.finish_run(self.username)
+            self._update_metrics()
+            if self.snapshot_path:
+                self._write_snapshot()
+
+    def _observe(self, media_id: int, started: float, latency: float, outcome: str):
+        """Count a completed call in metrics and append it to the history"""
+        self.metrics.observe_call(self.username, latency, outcome)
+        if self.history is not None:
+            wait = max(0.0, started - self._call_ended - self._paused_for)
+            self.history.record(time.time() - latency, media_id, outcome, latency, wait)
+        self._call_ended = started + latency
+        self._paused_for = 0.0
+
+    async def _unlike(self, media_id: int):
+        """Unlike one post
+
+        Returns True on success, None if a stop interrupted it, or an
+        (ErrorKind, reason, attempts) tuple when the post should be dead-lettered
+        or, for ErrorKind.AUTH, when the run has to stop.
+        Rate limits do not count as attempts; the governor decides the wait.
+        Only confirmed unlikes speed the governor up: a falsy result slows it
+        down like a throttle and still counts as an attempt.
+        """
+        attempts = 0
+        while True:
+            started = time.monotonic()
+            self._next_action = ('network', None)
+            with self.profiler.span('network'):
+                request = asyncio.ensure_future(self.client.unlike(media_id))
+                stopped = asyncio.ensure_future(self._stop.wait())
+                await asyncio.wait({request, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                stopped.cancel()
+                if not request.done() and self.draining:
+                    # Draining: record this call's outcome before stopping
+                    await asyncio.wait({request})
+            latency = time.monotonic() - started
+            if not request.done():
+                # Leave the request to finish on its thread; the item stays pending
+                self.metrics.add_time(self.username, 'network', latency)
+                return None
+            try:
+                if not request.result():
+                    raise UnlikeRejected("Instagram did not confirm the unlike")
+                self._observe(media_id, started, latency, 'success')
+                self.governor.on_success()
+                return True
+            except Exception as e:
+                kind = classify_error(e)
+                reason = f"{type(e).__name__}: {str(e)}"
+                if kind == ErrorKind.AUTH:
+                    self._observe(media_id, started, latency, 'auth_required')
+                    return kind, reason, attempts + 1
+                if kind == ErrorKind.RATE_LIMIT:
+                    self._observe(media_id, started, latency, 'rate_limited')
+                    status = http_status_of(e)
+                    self.governor.on_throttle(retry_after_of(e), f"HTTP {status}" if status else str(e))
+                    wait = self.governor.reserve()
+                else:
+                    attempts += 1
+                    rejected = isinstance(e, UnlikeRejected)
+                    if rejected:
+                        # ensta reports throttle pages as a plain False, so slow down as for a 429
+                        self.governor.on_throttle(None, 'unlike not confirmed')
+                    if kind == ErrorKind.PERMANENT:
+                        self._observe(media_id, started, latency, 'permanent_failure')
+                        return kind, reason, attempts
+                    if attempts >= CONFIG['max_retries']:
+                        self._observe(media_id, started, latency, 'retries_exhausted')
+                        return kind, reason, attempts
+                    self._observe(media_id, started, latency, 'retry')
+                    wait = backoff_delay(attempts, CONFIG['retry_delay'])
+                    if rejected:
+                        wait = max(wait, self.governor.reserve())
+                    error_msg = f"Failed to unlike post (attempt {attempts}/{CONFIG['max_retries']}): {str(e)}"
+                    logging.warning(f"{error_msg}; retrying in {wait:.0f}s")
+                    print(f"{ConsoleColors.YELLOW}[!] {error_msg}. Retrying...{ConsoleColors.RESET}")
+                if not await self.sleep(wait, 'cooldown'):
+                    return None
+
+    async def _process(self) -> str:
+        profiler = self.profiler
+        while not self.stopping:
+            with profiler.span('next'):
+                position = self.queue.next_pending()
+            if position is None:
+                return 'completed'
+            media_id = self.index.media_id(position)
+
+            wait = self.governor.reserve()
+            logging.debug(f"Pacing: waiting {wait:.1f}s (interval {self.governor.interval:.1f}s)")
+            if not await self.sleep(wait):
+                break
+            if not await self._wait_while_paused():
+                break
+
+            with profiler.span('unlike'):
+                result = await self._unlike(media_id)
+            if result is None:
+                break
+            if result is not True and result[0] == ErrorKind.AUTH:
+                # Every later post would fail the same way, so the post stays pending
+                error_msg = f"Instagram wants the login confirmed: {result[1]}"
+                logging.error(error_msg)
+                print(f"\n{ConsoleColors.RED}[✗] {error_msg}")
+                print(f"→ Confirm the login in the Instagram app, then run again. Progress is saved.{ConsoleColors.RESET}")
+                self.account_data['last_error'] = error_msg
+                return 'challenged'
+            started = time.monotonic()
+            if result is True:
+                with profiler.span('record'):
+                    self.unliked += 1
+                    self.account_data['total_unliked'] += 1
+                    self.index.mark_done(position)
+                    if self.journal.record(media_id, sync=False):
+                        self._flush_in_background()
+            else:
+                with profiler.span('dead_letter'):
+                    kind, reason, attempts = result
+                    error_msg = f"Failed to unlike post {media_id} ({kind}, {attempts} attempt(s)): {reason}"
+                    logging.error(error_msg)
+                    print(f"{ConsoleColors.RED}[✗] {error_msg}")
+                    print(f"→ Moved to the dead-letter queue{ConsoleColors.RESET}")
+                    self.account_data['last_error'] = error_msg
+                    self.dead_letters.add(media_id, kind, reason, attempts)
+                    self.failed += 1
+                    self.index.mark_failed(position)
+                    self._flush_in_background()
+            if self.progress_bar is not None:
+                with profiler.span('progress'):
+                    self.progress_bar.update(1)
+            self.metrics.add_time(self.username, 'io', time.monotonic() - started)
+            with profiler.span('metrics'):
+                self._update_metrics()
+            if result is not True:
+                continue
+
+            # Random break
+            if random.random() < CONFIG['break']['probability']:
+                self._flush_in_background()
+                break_time = random.uniform(CONFIG['break']['min'], CONFIG['break']['max'])
+                print(f"\n{ConsoleColors.BLUE}[*] Taking a break for {break_time/60:.1f} minutes...{ConsoleColors.RESET}")
+                if not await self.sleep(break_time, 'break'):
+                    break
+        return 'stopped'
+
+class ExitCode:
+    OK = 0            # Every queued post was unliked
+    ERROR = 1         # Unexpected error; see the logs
+    USAGE = 2         # Bad command line
+    NOT_FOUND = 3     # Unknown account or missing export file
+    AUTH = 4          # Login failed; needs a human
+    DEPENDENCIES = 5  # Required packages are missing
+    INCOMPLETE = 6    # Finished, but some posts are in the dead-letter queue
+    STOPPED = 75      # Stopped by a signal; progress is saved and the run can be restarted
+
+    @staticmethod
+    def combine(codes: List[int]) -> int:
+        """Single exit code for a command that handled several accounts"""
+        if ExitCode.STOPPED in codes:
+            return ExitCode.STOPPED
+        errors = [code for code in codes if code not in (ExitCode.OK, ExitCode.INCOMPLETE)]
+        if errors:
+            return errors[0]
+        return ExitCode.INCOMPLETE if ExitCode.INCOMPLETE in codes else ExitCode.OK
+
+class JsonProgress:
+    """Stand-in for tqdm that writes periodic JSON lines for unattended runs"""
+
+    def __init__(self, stream: IO[str], username: str, total: int, initial: int = 0,
+                 interval: float = 30.0, clock=time.monotonic):
+        self.stream = stream
+        self.username = username
+        self.total = total
+        self.initial = initial
+        self.n = initial
+        self.interval = interval
+        self.clock = clock
+        self.started = self._emitted = clock()
+        self.closed = False
+        self.eta: Optional[Dict[str, float]] = None  # RunPlanner estimate, when one is available
+        self.emit('start')
+
+    def update(self, n: int = 1):
+        self.n += n
+        if self.clock() - self._emitted >= self.interval:
+            self.emit('progress')
+
+    def emit(self, event: str, **fields):
+        now = self.clock()
+        elapsed = now - self.started
+        rate = (self.n - self.initial) / elapsed if elapsed > 0 else 0.0
+        record = {
+            "ts": datetime.now().isoformat(timespec='seconds'),
+            "event": event,
+            "account": self.username,
+            "done": self.n,
+            "total": self.total,
+            "rate": round(rate, 4),
+            "eta_seconds": round((self.total - self.n) / rate) if rate > 0 else None
+        }
+        if self.eta is not None:
+            record["eta_seconds"] = round(self.eta['p50'])
+            record["eta_p90_seconds"] = round(self.eta['p90'])
+        record.update(fields)
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+        self._emitted = now
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.emit('progress')
+
+class LogContext(logging.Filter):
+    """Stamps records with this process's session ID and the account run in progress
+
+    The session ID ties together every line from one invocation; run_id is
+    the StateStore run, so log lines can be joined to the runs table.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.session = os.urandom(6).hex()
+        self.account = None
+        self.run_id = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session = self.session
+        record.account = self.account
+        record.run_id = self.run_id
+        return True
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread
+
+    The stock prepare() formats the whole record in the calling thread. Here
+    a copy of the record is queued with only its arguments merged into the
+    message. An exception is turned into exc_text, so the traceback and its
+    frames are not kept alive while the record waits on the queue. Other
+    handlers see the caller's record unchanged.
+    """
+    _exceptions = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exceptions.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, with the correlation fields from LogContext"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "source": f"{record.filename}:{record.lineno}",
+            "thread": record.threadName,
+            "session": getattr(record, 'session', None),
+            "account": getattr(record, 'account', None),
+            "run_id": getattr(record, 'run_id', None)
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+def remove_expired_logs(directory: Path, pattern: str, days: float, keep=()) -> int:
+    """Delete log files matching pattern that were last written more than days ago"""
+    cutoff = time.time() - days * 86400
+    removed = 0
+    for log_file in Path(directory).glob(pattern):
+        if str(log_file.resolve()) in keep:
+            continue
+        try:
+            if log_file.stat().st_mtime < cutoff:
+                log_file.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that gzips rotated files and drops expired ones
+
+    Meant to sit behind a QueueListener, so compression and cleanup happen
+    on the listener thread rather than in the code that logged.
+    """
+
+    def __init__(self, filename, max_bytes: int, backup_count: int, retention_days: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.retention_days = retention_days
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    def _compress(self, source: str, dest: str):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+        path = Path(self.baseFilename)
+        remove_expired_logs(path.parent, f"{path.name}.*.gz", self.retention_days)
+
 class InstagramUnliker: 
+    LOG_RETENTION_DAYS = 5
+
     def __init__(self):
         """Initialize the Instagram Unliker application"""
         logging.info("Starting Instagram Unliker application...")
         
         self.config_file = "config.json"
+        self.state_file = "state.db"
+        self.store = None
         self.accounts_dir = Path("accounts")
         self.logs_dir = Path("logs")
+        self.journal_dir = Path("journal")
+        self.index_dir = Path("index")
+        self.sessions_dir = Path("sessions")
+        self.deadletter_dir = Path("deadletter")
+        self.control_dir = Path("control")
+        self.history_dir = Path("history")
+        self.profile_dir = Path("profile")
+        self.env_stamp = EnvironmentStamp("env_stamp.json")
+        self.environment_checked = self.env_stamp.is_valid()
         self.running = True
+        self.progress_stream = None  # JSON-lines progress instead of tqdm when set
+        self.progress_interval = 30
+        self.client_factory = None  # (username, password) -> client, used instead of ensta.Web when set
+        self.metrics = RunMetrics()
+        self.metrics_server = None
+        self.profiling = None  # RunProfiler options (cprofile, tracemalloc, interval) when runs are profiled
+        self.profiler = RunProfiler()
+        self.log_context = LogContext()
+        self._log_listener = None
+        self._log_handlers = ()
         
         # Create necessary directories
         self._create_required_directories()
@@ -84,12 +2746,21 @@ class InstagramUnliker:
         
     def _ensure_python_environment(self):
         """Ensure Python and pip are properly installed"""
-        try:
-            # Check if pip is installed
-            import pip
-        except ImportError:
+        if self.environment_checked:
+            return
+        # Locate pip without importing it; the import alone is slow
+        import importlib.util
+        if importlib.util.find_spec("pip") is None:
             logging.warning("pip is not installed. Installing pip...")
             self._install_pip()
+
+    def save_environment_stamp(self):
+        """Skip the startup checks on later launches until the environment changes"""
+        try:
+            self.env_stamp.save()
+            self.environment_checked = True
+        except OSError as e:
+            logging.warning(f"Could not save environment stamp: {str(e)}")
             
     def _install_pip(self):
         """Install pip if not present"""
@@ -115,41 +2786,48 @@ class InstagramUnliker:
         signal.signal(signal.SIGTERM, self._handle_shutdown)
         
     def _handle_shutdown(self, signum, frame):
-        """Handle shutdown signals gracefully"""
+        """Handle shutdown signals outside a run
+
+        A run replaces this with handlers that stop its engine between steps.
+        Elsewhere the signal unwinds as KeyboardInterrupt, so state store
+        transactions roll back and the exit hooks run.
+        """
         print(f"\n{ConsoleColors.YELLOW}[!] Received shutdown signal. Cleaning up...{ConsoleColors.RESET}")
         self.running = False
-        time.sleep(1)  # Give time for cleanup
-        sys.exit(0)
+        raise KeyboardInterrupt
         
     def setup_logging(self):
-        """Configure logging with enhanced rotation and cleanup"""
+        """Log to the console directly and through a queue to the file on a listener thread
+
+        The file gets JSON lines stamped with the session and run IDs, rotated
+        at 5MB into gzipped backups that expire after LOG_RETENTION_DAYS. A
+        full or slow disk then only fills the queue instead of blocking the
+        run loop. The console handler stays synchronous so its lines keep
+        their order with the print() output around them.
+        """
         self.logs_dir = Path("logs")
         self.logs_dir.mkdir(exist_ok=True)
         
-        # Set up rotating file handler
-        log_file = self.logs_dir / "unliker.log"
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=5*1024*1024,  # 5MB per file
-            backupCount=5,  # Keep 5 backup files
-            encoding='utf-8'
+        file_handler = CompressingRotatingFileHandler(
+            self.logs_dir / "unliker.jsonl",
+            max_bytes=5*1024*1024,  # 5MB per file
+            backup_count=100,  # Backups are mostly pruned by age
+            retention_days=self.LOG_RETENTION_DAYS
         )
+        file_handler.setFormatter(JsonLogFormatter())
         
-        # Set up formatters with more detailed information
-        file_formatter = logging.Formatter(
-            '%(asctime)s [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        console_formatter = logging.Formatter(
+        # Console handler with color support
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter(
             '%(asctime)s [%(levelname)s] %(message)s',
             datefmt='%H:%M:%S'
-        )
-        
-        file_handler.setFormatter(file_formatter)
+        ))
         
-        # Console handler with color support
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(console_formatter)
+        queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(self.log_context)
+        self._log_listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+        self._log_handlers = (file_handler, console_handler)
+        self._log_listener.start()
         
         # Root logger configuration
         root_logger = logging.getLogger()
@@ -157,12 +2835,14 @@ class InstagramUnliker:
         
         # Remove existing handlers and add new ones
         root_logger.handlers.clear()
-        root_logger.addHandler(file_handler)
+        root_logger.addHandler(queue_handler)
         root_logger.addHandler(console_handler)
         
         # Register cleanup on exit
         atexit.register(self._cleanup_logs)
         
+        threading.Thread(target=self._cleanup_old_logs, args=(self.LOG_RETENTION_DAYS,),
+                         name="log-cleanup", daemon=True).start()
         logging.info("Logging system initialized")
         
     def _cleanup_logs(self):
@@ -172,8 +2852,11 @@ class InstagramUnliker:
             # Save any pending configurations
             self.save_config()
             
-            # Close all handlers
-            for handler in logging.getLogger().handlers:
+            # Drain the queue, then close the real handlers
+            if self._log_listener is not None:
+                self._log_listener.stop()
+                self._log_listener = None
+            for handler in self._log_handlers:
                 handler.close()
                 
         except Exception as e:
@@ -190,12 +2873,12 @@ class InstagramUnliker:
         logging.info("-" * 50)
 
     def _cleanup_old_logs(self, days=5):
-        """Clean up log files older than specified days"""
+        """Clean up log files older than specified days, including pre-JSON unliker.log files"""
         try:
-            cutoff = datetime.now() - timedelta(days=days)
-            for log_file in self.logs_dir.glob("*.log"):
-                if datetime.fromtimestamp(log_file.stat().st_mtime) < cutoff:
-                    log_file.unlink()
+            active = {str(Path(handler.baseFilename).resolve()) for handler in self._log_handlers
+                      if isinstance(handler, logging.FileHandler)}
+            for pattern in ("*.log", "*.log.*", "*.jsonl.*.gz"):
+                remove_expired_logs(self.logs_dir, pattern, days, keep=active)
         except Exception as e:
             logging.warning(f"Failed to cleanup old logs: {str(e)}")
 
@@ -204,6 +2887,11 @@ class InstagramUnliker:
         try:
             self.accounts_dir.mkdir(exist_ok=True)
             self.logs_dir.mkdir(exist_ok=True)
+            self.journal_dir.mkdir(exist_ok=True)
+            self.index_dir.mkdir(exist_ok=True)
+            self.sessions_dir.mkdir(exist_ok=True)
+            self.deadletter_dir.mkdir(exist_ok=True)
+            self.history_dir.mkdir(exist_ok=True)
             logging.info("Required directories created successfully")
         except Exception as e:
             logging.error(f"Failed to create directories: {str(e)}")
@@ -221,13 +2909,8 @@ class InstagramUnliker:
     def install_requirements(self) -> bool:
         """Install required Python packages with detailed error handling"""
         try:
-            # First uninstall ensta if it exists
-            subprocess.run([sys.executable, "-m", "pip", "uninstall", "-y", "ensta"], 
-                          stdout=subprocess.PIPE, 
-                          stderr=subprocess.PIPE)
-            
-            # Install specific version of ensta
-            result = subprocess.run([sys.executable, "-m", "pip", "install", "--no-cache-dir", "ensta==5.2.9"],
+            # pip replaces a different installed version itself
+            result = subprocess.run([sys.executable, "-m", "pip", "install", "ensta==5.2.9"],
                                   stdout=subprocess.PIPE,
                                   stderr=subprocess.PIPE)
             
@@ -238,6 +2921,7 @@ class InstagramUnliker:
                 
             logging.info("Successfully installed ensta")
             print(f"{ConsoleColors.GREEN}[✓] Successfully installed ensta{ConsoleColors.RESET}")
+            self.env_stamp.invalidate()
             return True
             
         except Exception as e:
@@ -266,6 +2950,27 @@ class InstagramUnliker:
                 os.rename(self.config_file, backup_file)
                 print(f"{ConsoleColors.YELLOW}[!] Backed up corrupted config to {backup_file}{ConsoleColors.RESET}")
                 self.check_and_create_config()
+                return
+        self._load_state()
+
+    def _load_state(self):
+        """Open the state store and apply the settings saved in it
+
+        config.json only seeds the store; later changes are saved as rows.
+        """
+        if self.store is None:
+            self.store = StateStore(self.state_file)
+            migrated = self.store.migrate_legacy_accounts(self.accounts_dir, CONFIG['accounts'])
+            if migrated:
+                print(f"{ConsoleColors.GREEN}[✓] Migrated {migrated} account(s) to {self.state_file}{ConsoleColors.RESET}")
+        settings = self.store.load_settings()
+        if settings:
+            for key, value in settings.items():
+                if key in CONFIG and key != 'accounts':
+                    CONFIG[key] = value
+        else:
+            self.save_config()
+        CONFIG['accounts'] = self.store.account_options()
 
     def add_account(self):
         """Add account with improved UI"""
@@ -279,32 +2984,14 @@ class InstagramUnliker:
             print(f"{ConsoleColors.RED}Username and password are required{ConsoleColors.RESET}")
             return
         
-        self.accounts_dir.mkdir(exist_ok=True)
-        account_file = self.accounts_dir / f"{username}.json"
-        
-        if account_file.exists():
+        if self.store.has_account(username):
             override = input(f"{ConsoleColors.YELLOW}Account exists. Replace? (y/N): {ConsoleColors.RESET}").lower()
             if override != 'y':
                 return
         
-        account_data = {
-            "username": username,
-            "password": password,
-            "last_run": None,
-            "total_unliked": 0,
-            "last_error": None,
-            "created_at": datetime.now().isoformat()
-        }
-        
         try:
-            with open(account_file, 'w') as f:
-                json.dump(account_data, f, indent=4)
-            
-            CONFIG['accounts'][username] = {
-                "enabled": True,
-                "delay_multiplier": 1.0
-            }
-            self.save_config()
+            self.store.add_account(username, password)
+            CONFIG['accounts'][username] = self.store.account_options()[username]
             
             print(f"{ConsoleColors.GREEN}✨ Account @{username} added successfully!{ConsoleColors.RESET}")
         except Exception as e:
@@ -333,18 +3020,14 @@ class InstagramUnliker:
                 return
                 
             username = accounts[choice - 1]
-            account_file = self.accounts_dir / f"{username}.json"
             
             confirm = input(f"{ConsoleColors.YELLOW}[!] Are you sure you want to remove {username}? (y/N): {ConsoleColors.RESET}").lower()
             if confirm != 'y':
                 return
             
-            if account_file.exists():
-                account_file.unlink()
-                
-            if username in CONFIG['accounts']:
-                del CONFIG['accounts'][username]
-                self.save_config()
+            self.store.remove_account(username)
+            SessionCache(self.sessions_dir).invalidate(username)
+            CONFIG['accounts'].pop(username, None)
                 
             print(f"{ConsoleColors.GREEN}[✓] Account {username} removed successfully{ConsoleColors.RESET}")
             
@@ -353,152 +3036,592 @@ class InstagramUnliker:
 
     def list_accounts(self) -> List[str]:
         """List all configured accounts"""
-        if not self.accounts_dir.exists():
+        if self.store is None:
             return []
-            
-        return [f.stem for f in self.accounts_dir.glob("*.json")]
+        return self.store.list_accounts()
 
     def save_config(self):
-        """Save current configuration"""
+        """Save changed settings to the state store"""
+        if self.store is None:
+            return
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(CONFIG, f, indent=4)
+            self.store.save_settings({key: value for key, value in CONFIG.items() if key != 'accounts'})
         except Exception as e:
             print(f"{ConsoleColors.RED}[✗] Failed to save configuration: {str(e)}{ConsoleColors.RESET}")
 
-    def unlike_posts(self, username: str):
-        """Unlike posts using JSON file"""
-        account_file = self.accounts_dir / f"{username}.json"
+    def unlike_posts(self, username: str, post_filter: Optional[PostFilter] = None) -> int:
+        """Unlike posts from the liked posts export and return an ExitCode
+
+        With a post_filter only the matching posts are unliked, in its order.
+        With profiling set, the run is profiled into its own directory under
+        profile/.
+        """
+        self.log_context.account = username
+        try:
+            with self._profiled(username, 'unlike_posts'):
+                return self._unlike_posts(username, post_filter)
+        finally:
+            self.log_context.account = self.log_context.run_id = None
+
+    @contextlib.contextmanager
+    def _profiled(self, username: str, span: str):
+        """Profile the enclosed work as span into profile/USERNAME-TIME-SPAN/ when profiling is set"""
+        if self.profiling is not None:
+            self.profiler = RunProfiler(self.profile_dir / f"{username}-{datetime.now():%Y%m%d-%H%M%S}-{span}",
+                                        **self.profiling)
+        try:
+            with self.profiler.span(span):
+                yield
+        finally:
+            directory = self.profiler.close()
+            self.profiler = RunProfiler()
+            if directory is not None:
+                logging.info(f"Profile written to {directory}")
+                print(f"{ConsoleColors.BLUE}[*] Profile written to {directory}{ConsoleColors.RESET}")
+
+    def _unlike_posts(self, username: str, post_filter: Optional[PostFilter]) -> int:
         progress_bar = None  # Initialize progress_bar at the beginning of the method
+        run_id = None
         
-        if not account_file.exists():
-            error_msg = f"Account file not found for {username}"
+        account_data = self.store.get_account(username)
+        if account_data is None:
+            error_msg = f"Account not found for {username}"
             logging.error(error_msg)
             print(f"\n{ConsoleColors.RED}[✗] {error_msg}. Please add it first.{ConsoleColors.RESET}")
-            return
+            return ExitCode.NOT_FOUND
             
         try:
-            with open(account_file, 'r') as f:
-                account_data = json.load(f)
-            
             print(f"\n{ConsoleColors.CYAN}Starting to unlike posts for @{username}...{ConsoleColors.RESET}")
             print(f"{ConsoleColors.YELLOW}This will run in the background. You can close anytime.{ConsoleColors.RESET}")
             
             try:
-                from ensta import Web
-                client = Web(account_data['username'], account_data['password'])
-                print(f"{ConsoleColors.GREEN}✓ Successfully logged in{ConsoleColors.RESET}")
-                account = client.private_info()
+                with self.profiler.span('login'):
+                    client, account = self.login(account_data['username'], account_data['password'])
                 print(f"{ConsoleColors.GREEN}Logged in as: {ConsoleColors.CYAN}{account.username}{ConsoleColors.RESET}")
             except Exception as e:
                 error_msg = f"Login failed: {str(e)}"
                 logging.error(error_msg)
                 print(f"{ConsoleColors.RED}[✗] {error_msg}")
                 print(f"→ Please check your username and password.{ConsoleColors.RESET}")
-                return
+                self.store.set_last_error(username, error_msg)
+                return ExitCode.AUTH
 
-            # Try to load liked posts from JSON file
-            if not os.path.exists('liked_posts.json'):
-                error_msg = "liked_posts.json file not found"
+            # Liked posts come from liked_posts.json or the data-download ZIP
+            export_path = CONFIG['export']['path']
+            if not os.path.exists(export_path):
+                error_msg = f"{export_path} file not found"
                 logging.error(error_msg)
                 print(f"{ConsoleColors.RED}[✗] {error_msg}. Please ensure it exists.{ConsoleColors.RESET}")
-                return
+                return ExitCode.NOT_FOUND
+
+            journal = ProgressJournal(
+                self.journal_dir / f"{username}.journal",
+                flush_every=CONFIG['journal']['flush_every'],
+                flush_interval=CONFIG['journal']['flush_interval']
+            )
 
+            index = None
+            status = 'stopped'
+            failed = 0
             try:
-                with open('liked_posts.json', 'r') as f:
-                    liked_data = json.load(f)
+                with self.profiler.span('index'):
+                    index = self.load_work_index(username, export_path, journal)
+                    self.store.save_queue(username, export_path, index)
                     
-                if not liked_data.get('likes_media_likes'):
-                    error_msg = "No liked posts found in JSON file"
+                if not len(index):
+                    error_msg = f"No liked posts found in {export_path}"
                     logging.warning(error_msg)
                     print(f"{ConsoleColors.YELLOW}[!] {error_msg}!{ConsoleColors.RESET}")
-                    return
-                    
-                total_posts = len(liked_data['likes_media_likes'])
-                first_likes_media_likes = total_posts
-                unliked_count = 0
+                    return ExitCode.OK
 
-                print(f"{ConsoleColors.BLUE}Found {total_posts} liked posts{ConsoleColors.RESET}")
+                selection = None
+                if post_filter is not None and post_filter != PostFilter():
+                    selection = WorkSelection(index, index.select(post_filter))
+                    print(f"{ConsoleColors.BLUE}Selected {len(selection)} of {len(index)} liked posts: "
+                          f"{describe_post_filter(post_filter)}{ConsoleColors.RESET}")
+                    if not len(selection):
+                        print(f"{ConsoleColors.YELLOW}[!] No liked posts match the filter{ConsoleColors.RESET}")
+                        return ExitCode.OK
+                queue = selection if selection is not None else index
+                total_posts = len(queue)
+                processed = queue.processed_count()
+                run_id = self.store.start_run(username)
+                self.log_context.run_id = run_id
+
+                print(f"{ConsoleColors.BLUE}Found {total_posts} liked posts ({total_posts - processed} remaining){ConsoleColors.RESET}")
+                with self.profiler.span('plan'):
+                    planner = self.create_planner(username)
+                    estimate = planner.estimate(total_posts - processed)
+                print(f"{ConsoleColors.BLUE}Estimated time: {format_duration(estimate['p50'])} "
+                      f"(P90 {format_duration(estimate['p90'])}){ConsoleColors.RESET}")
                 
-                progress_bar = tqdm(
-                    total=total_posts,
-                    desc=f"🔄 Unliking posts",
-                    bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [ETA: {remaining}]'
-                )
+                journal.open()
+                progress_bar = self._create_progress(username, total_posts, processed)
                 
-                while liked_data['likes_media_likes'] and self.running:
-                    try:
-                        base_delay = random.uniform(CONFIG['delay']['min'], CONFIG['delay']['max'])
-                        actual_delay = base_delay * CONFIG['accounts'][username].get('delay_multiplier', 1.0)
-                        time.sleep(actual_delay)
-                        
-                        post = liked_data['likes_media_likes'].pop(0)
-                        media_id = instagram_code_to_media_id(post['string_list_data'][0]['href'])
-                        
-                        # Unlike with retry mechanism and detailed error logging
-                        for retry in range(CONFIG['max_retries']):
-                            try:
-                                client.unlike(media_id)
-                                break
-                            except Exception as e:
-                                error_msg = f"Failed to unlike post (attempt {retry + 1}/{CONFIG['max_retries']}): {str(e)}"
-                                logging.warning(error_msg)
-                                if retry < CONFIG['max_retries'] - 1:
-                                    print(f"{ConsoleColors.YELLOW}[!] {error_msg}. Retrying...{ConsoleColors.RESET}")
-                                    time.sleep(CONFIG['retry_delay'])
-                                else:
-                                    raise Exception(error_msg)
-
-                        unliked_count += 1
-                        account_data['total_unliked'] += 1
-                        progress_bar.update(1)
-                        
-                        # Update JSON file
-                        with open('liked_posts.json', 'w') as f:
-                            json.dump(liked_data, f, indent=4)
-                        
-                        # Random break
-                        if random.random() < CONFIG['break']['probability']:
-                            break_time = random.uniform(CONFIG['break']['min'], CONFIG['break']['max'])
-                            print(f"\n{ConsoleColors.BLUE}[*] Taking a break for {break_time/60:.1f} minutes...{ConsoleColors.RESET}")
-                            time.sleep(break_time)
-                            
-                    except Exception as e:
-                        error_msg = f"Failed to unlike post: {str(e)}"
-                        logging.error(error_msg, exc_info=True)  # Include full traceback in logs
-                        print(f"{ConsoleColors.RED}[✗] {error_msg}")
-                        print(f"→ Taking a 5-minute cooldown...{ConsoleColors.RESET}")
-                        account_data['last_error'] = error_msg
-                        time.sleep(300)  # 5 minute cooldown on error
+                async_client = AsyncInstagramClient(client)
+                dead_letters = DeadLetterQueue(self.deadletter_dir / f"{username}.jsonl")
+                self.start_metrics_server()
+                # Set again only if this run dead-letters a post or has to stop
+                account_data['last_error'] = None
+                engine = UnlikeEngine(username, account_data, async_client, index, journal,
+                                      self.store, run_id, dead_letters, progress_bar, self.metrics, planner,
+                                      selection, self.control_path(username), self.run_history(username, run_id),
+                                      self.profiler)
+                try:
+                    with self.profiler.span('engine'):
+                        status = asyncio.run(engine.run())
+                finally:
+                    async_client.close()
+                failed = index.failed_count()
+                if status == 'stopped':
+                    print(f"\n{ConsoleColors.YELLOW}[!] Stopped. Progress is saved and will resume next run.{ConsoleColors.RESET}")
+                elif status == 'challenged':
+                    # The cached session is no longer accepted; the next run logs in from scratch
+                    SessionCache(self.sessions_dir).invalidate(username)
                         
             finally:
+                journal.close()
+                if index is not None:
+                    index.close()
                 if progress_bar is not None:
                     progress_bar.close()
                 
             # Update account stats
-            account_data['last_run'] = datetime.now().isoformat()
-            with open(account_file, 'w') as f:
-                json.dump(account_data, f, indent=4)
+            if run_id is not None:
+                self.store.finish_run(run_id, username, status, account_data['last_error'])
                 
             print(f"\n{ConsoleColors.GREEN}[✓] Unliking complete for {username}{ConsoleColors.RESET}")
             print(f"{ConsoleColors.BLUE}[*] Total unliked: {account_data['total_unliked']}{ConsoleColors.RESET}")
+            if status == 'stopped':
+                return ExitCode.STOPPED
+            if status == 'challenged':
+                return ExitCode.AUTH
+            return ExitCode.INCOMPLETE if failed else ExitCode.OK
             
-        except json.JSONDecodeError as e:
-            error_msg = f"Invalid JSON format in account file: {str(e)}"
-            logging.error(error_msg)
-            print(f"{ConsoleColors.RED}[✗] {error_msg}")
-            print("→ Try removing and re-adding your account.{ConsoleColors.RESET}")
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             logging.error(error_msg, exc_info=True)  # Include full traceback in logs
             print(f"\n{ConsoleColors.RED}[✗] {error_msg}")
             print("→ The error has been logged. Please check the logs for details.{ConsoleColors.RESET}")
             try:
-                account_data['last_error'] = error_msg
-                with open(account_file, 'w') as f:
-                    json.dump(account_data, f, indent=4)
+                if run_id is not None:
+                    self.store.finish_run(run_id, username, 'failed', error_msg)
+                else:
+                    self.store.set_last_error(username, error_msg)
             except:
-                logging.error("Failed to save error information to account file", exc_info=True)
+                logging.error("Failed to save error information to the state store", exc_info=True)
+            return ExitCode.ERROR
+
+    def run_history(self, username: str, run_id: int = 0) -> RunHistory:
+        """Per-call history of an account's runs; run_id tags the events appended to it"""
+        return RunHistory(self.history_dir / f"{username}.events", run_id)
+
+    def report(self, username: str, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """Throughput, error rates and pacing efficiency from an account's run history"""
+        started = time.perf_counter()
+        report = {"account": username, **self.run_history(username).report(since, until)}
+        report['report_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return report
+
+    def control_path(self, username: str) -> Path:
+        """Unix socket a running job for the account listens on"""
+        return self.control_dir / f"{username}.sock"
+
+    def start_metrics_server(self):
+        """Serve metrics on localhost if a port is configured; runs until the process exits"""
+        port = CONFIG['metrics']['port']
+        if not port or self.metrics_server is not None:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.metrics, port).start()
+        except OSError as e:
+            # Metrics are optional; a taken port must not stop the run
+            logging.warning(f"Could not serve metrics on port {port}: {str(e)}")
+
+    def _create_progress(self, username: str, total: int, initial: int):
+        """tqdm bar for a terminal, JSON lines when running unattended"""
+        if self.progress_stream is not None:
+            return JsonProgress(self.progress_stream, username, total, initial, self.progress_interval)
+        from tqdm import tqdm
+        return tqdm(
+            total=total,
+            initial=initial,
+            desc=f"🔄 Unliking posts",
+            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}{postfix}]'
+        )
+
+    def ingest(self, username: str) -> int:
+        """Compile the export into an account's work queue without logging in"""
+        if not self.store.has_account(username):
+            logging.error(f"Account not found for {username}")
+            print(f"{ConsoleColors.RED}[✗] Account not found for {username}. Please add it first.{ConsoleColors.RESET}")
+            return ExitCode.NOT_FOUND
+        export_path = CONFIG['export']['path']
+        if not os.path.exists(export_path):
+            logging.error(f"{export_path} file not found")
+            print(f"{ConsoleColors.RED}[✗] {export_path} file not found. Please ensure it exists.{ConsoleColors.RESET}")
+            return ExitCode.NOT_FOUND
+
+        journal = ProgressJournal(self.journal_dir / f"{username}.journal")
+        with self._profiled(username, 'ingest'):
+            index = self.load_work_index(username, export_path, journal)
+        try:
+            self.store.save_queue(username, export_path, index)
+            print(f"{ConsoleColors.GREEN}[✓] Queued {len(index) - index.processed_count()} of "
+                  f"{len(index)} posts for {username}{ConsoleColors.RESET}")
+        finally:
+            index.close()
+        return ExitCode.OK
+
+    def job_running(self, username: str) -> bool:
+        """Check whether a run for the account answers on its control socket"""
+        path = self.control_path(username)
+        if not ControlServer.supported() or not path.exists():
+            return False
+        try:
+            return control_request(path, 'status', timeout=2).get('ok', False)
+        except OSError:
+            return False
+
+    def reconcile(self, username: str, dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        """Rebuild an account's queue from a fresh export, keeping what earlier runs did
+
+        The export is compiled next to the current work index, done and failed
+        state is carried over by media ID, dead letters for posts that are no
+        longer liked are dropped, and the new index replaces the old one. Returns
+        the difference between the two exports, or None if nothing was done.
+        """
+        export_path = CONFIG['export']['path']
+        if not os.path.exists(export_path):
+            logging.error(f"{export_path} file not found")
+            print(f"{ConsoleColors.RED}[✗] {export_path} file not found. Please ensure it exists.{ConsoleColors.RESET}")
+            return None
+        if self.job_running(username):
+            print(f"{ConsoleColors.RED}[✗] A run for {username} is in progress; drain it before reconciling{ConsoleColors.RESET}")
+            return None
+
+        started = time.perf_counter()
+        index_path = self.index_dir / f"{username}.idx"
+        new_path = index_path.with_suffix('.reconcile.idx')
+        journal = ProgressJournal(self.journal_dir / f"{username}.journal")
+        previous = None
+        if index_path.exists():
+            try:
+                previous = WorkIndex(index_path)
+                previous.replay_journal(journal)
+            except ValueError as e:
+                logging.warning(f"Reconciling {username} against the journal only: {str(e)}")
+        self.compile_work_index(username, export_path, journal, new_path)
+        index = WorkIndex(new_path)
+        try:
+            if previous is not None:
+                counts = index.carry_over(previous)
+            else:
+                done, failed = index.done_count(), index.failed_count()
+                counts = dict(newly_liked=len(index) - done - failed, still_pending=0, failed_still_liked=failed,
+                              unliked_still_listed=done, confirmed_removed=0, failed_removed=0,
+                              removed_elsewhere=0)
+
+            dead_letters = DeadLetterQueue(self.deadletter_dir / f"{username}.jsonl")
+            entries = dead_letters.load()
+            positions = index.locate([entry['media_id'] for entry in entries])
+            still_liked = [entry for entry, position in zip(entries, positions) if position >= 0]
+            report = {
+                "account": username,
+                "export": str(export_path),
+                "previous_total": len(previous) if previous is not None else None,
+                "total": len(index),
+                "queued": len(index) - index.processed_count(),
+                **counts,
+                "dead_letters_cleared": len(entries) - len(still_liked),
+                "dry_run": dry_run,
+                "reconcile_ms": 0.0
+            }
+            if not dry_run:
+                if len(still_liked) != len(entries):
+                    dead_letters.replace(still_liked)
+        finally:
+            index.close()
+            if previous is not None:
+                previous.close()
+
+        if dry_run:
+            new_path.unlink()
+        else:
+            os.replace(new_path, index_path)
+            index = WorkIndex(index_path)
+            try:
+                self.store.save_queue(username, export_path, index)
+            finally:
+                index.close()
+        report['reconcile_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        logging.info(f"Reconciled {username} with {export_path}: {report['queued']} queued, "
+                     f"{report['confirmed_removed']} confirmed removed, {report['newly_liked']} newly liked"
+                     f"{' (dry run)' if dry_run else ''}")
+        return report
+
+    def create_planner(self, username: str) -> RunPlanner:
+        """RunPlanner for the account's settings, calibrated with its past runs
+
+        The failure rate comes from the run history, the backoff spent on each
+        dead-lettered post from the dead-letter queue, and the call latency
+        from the last metrics snapshot.
+        """
+        unliked, failed = self.store.outcome_totals(username)
+        failure_rate = failed / (unliked + failed) if unliked + failed else 0.0
+
+        # Expected backoff_delay before each retry that did not help
+        base = CONFIG['retry_delay']
+        costs = [sum(0.75 * min(base * 32, base * 2 ** (attempt - 1))
+                     for attempt in range(1, entry.get('attempts', 1)))
+                 for entry in DeadLetterQueue(self.deadletter_dir / f"{username}.jsonl").load()]
+        retry_cost = sum(costs) / len(costs) if costs else 0.0
+
+        latency = 1.0
+        snapshot_path = CONFIG['metrics']['snapshot_path']
+        try:
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                latency = json.load(f)['accounts'][username]['latency']['mean'] or latency
+        except (OSError, TypeError, KeyError, ValueError):
+            pass
+
+        return RunPlanner.from_config(
+            CONFIG['accounts'].get(username, {}).get('delay_multiplier', 1.0),
+            failure_rate=failure_rate, retry_cost=retry_cost, latency=latency
+        )
+
+    def plan(self, username: str, items: Optional[int] = None, simulations: int = 2000,
+             post_filter: Optional[PostFilter] = None) -> Dict[str, Any]:
+        """Simulated completion times for an account's pending queue, or for items posts
+
+        With a post_filter, only pending posts that match it are planned.
+        """
+        if items is None and post_filter is not None and post_filter != PostFilter():
+            items = 0
+            index_path = self.index_dir / f"{username}.idx"
+            try:
+                index = WorkIndex(index_path)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Cannot plan a filtered run for {username} until the export is ingested: {str(e)}")
+            else:
+                try:
+                    selection = WorkSelection(index, index.select(post_filter))
+                    items = len(selection) - selection.processed_count()
+                finally:
+                    index.close()
+        if items is None:
+            queue = self.account_status(username)['queue']
+            items = queue['pending'] if queue else 0
+        planner = self.create_planner(username)
+        started = time.perf_counter()
+        estimate = planner.estimate(items, simulations)
+        elapsed = time.perf_counter() - started
+        now = datetime.now()
+        return {
+            "account": username,
+            "items": items,
+            "simulations": simulations,
+            "seconds": {key: round(value) for key, value in estimate.items()},
+            "finish_p50": (now + timedelta(seconds=estimate['p50'])).isoformat(timespec='minutes'),
+            "finish_p90": (now + timedelta(seconds=estimate['p90'])).isoformat(timespec='minutes'),
+            "model": {
+                "interval": [planner.min_interval, planner.start_interval],
+                "break_probability": planner.break_probability,
+                "failure_rate": round(planner.failure_rate, 6),
+                "retry_cost": round(planner.retry_cost, 1),
+                "latency": round(planner.latency, 3)
+            },
+            "simulation_ms": round(elapsed * 1000, 1)
+        }
+
+    def account_status(self, username: str) -> Dict[str, Any]:
+        """Queue position, last run and dead-letter count for one account"""
+        summary = next(row for row in self.store.account_summaries() if row['username'] == username)
+        runs = self.store.recent_runs(username, limit=1)
+        last_run = runs[0] if runs else None
+        total = summary['queue_total'] or 0
+        done = summary['queue_done'] or 0
+        failed = summary['queue_failed'] or 0
+        return {
+            "account": username,
+            "enabled": CONFIG['accounts'].get(username, {}).get('enabled', True),
+            "running": bool(last_run) and last_run['finished_at'] is None,
+            "queue": {"total": total, "done": done, "failed": failed,
+                      "pending": total - done - failed} if summary['queue_total'] is not None else None,
+            "dead_letters": len(DeadLetterQueue(self.deadletter_dir / f"{username}.jsonl").load()),
+            "total_unliked": summary['total_unliked'],
+            "last_run": last_run,
+            "last_error": summary['last_error']
+        }
+
+    def reprocess_dead_letters(self, username: str) -> int:
+        """Requeue an account's dead-lettered posts so the next run retries them"""
+        dead_letters = DeadLetterQueue(self.deadletter_dir / f"{username}.jsonl")
+        entries = dead_letters.load()
+        if not entries:
+            print(f"{ConsoleColors.YELLOW}[!] No failed posts for {username}{ConsoleColors.RESET}")
+            return 0
+
+        requeued = 0
+        index_path = self.index_dir / f"{username}.idx"
+        index = None
+        if index_path.exists():
+            try:
+                index = WorkIndex(index_path)
+            except ValueError as e:
+                # Recompiled on the next run, which leaves every failed post pending again
+                logging.warning(f"Discarding unreadable work index: {str(e)}")
+        if index is not None:
+            try:
+                requeued = index.requeue_failed({entry['media_id'] for entry in entries})
+                self.store.save_queue(username, CONFIG['export']['path'], index)
+            finally:
+                index.close()
+        archived = dead_letters.archive()
+        logging.info(f"Requeued {requeued} dead-lettered posts for {username}; archived to {archived}")
+        print(f"{ConsoleColors.GREEN}[✓] Requeued {requeued} of {len(entries)} failed posts{ConsoleColors.RESET}")
+        return requeued
+
+    def _reprocess_menu(self):
+        """Display account selection menu for retrying dead-lettered posts"""
+        accounts = self.list_accounts()
+        if not accounts:
+            print(f"{ConsoleColors.RED}[✗] No accounts configured. Please add an account first.{ConsoleColors.RESET}")
+            return
+
+        print(f"\n{ConsoleColors.BLUE}[↻] Retry Failed Posts{ConsoleColors.RESET}")
+        print("-" * 30)
+        for i, acc in enumerate(accounts, 1):
+            entries = DeadLetterQueue(self.deadletter_dir / f"{acc}.jsonl").load()
+            kinds = {}
+            for entry in entries:
+                kinds[entry.get('kind')] = kinds.get(entry.get('kind'), 0) + 1
+            summary = ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items())) or "none"
+            print(f"{ConsoleColors.BOLD}{i}{ConsoleColors.RESET}. [{acc}] - failed: {summary}")
+
+        try:
+            choice = input(f"\n{ConsoleColors.BOLD}[>] Select account (0 to cancel): {ConsoleColors.RESET}")
+            if not choice.isdigit() or int(choice) == 0:
+                return
+
+            choice = int(choice)
+            if choice < 1 or choice > len(accounts):
+                print(f"{ConsoleColors.RED}[✗] Invalid selection{ConsoleColors.RESET}")
+                return
+
+            username = accounts[choice - 1]
+            if self.reprocess_dead_letters(username):
+                start = input(f"{ConsoleColors.YELLOW}Start unliking now? (y/N): {ConsoleColors.RESET}").lower()
+                if start == 'y':
+                    self.unlike_posts(username)
+
+        except Exception as e:
+            print(f"{ConsoleColors.RED}[✗] Error: {str(e)}{ConsoleColors.RESET}")
+
+    def login(self, username: str, password: str):
+        """Log in, reusing the cached session unless it expired or is rejected"""
+        if self.client_factory is not None:
+            client = self.client_factory(username, password)
+            return client, client.private_info()
+
+        from ensta import Web
+
+        sessions = SessionCache(self.sessions_dir, CONFIG['session']['max_age_days'])
+        session_file = sessions.session_file(username)
+
+        def create_client():
+            try:
+                return Web(username, password, file=str(session_file))
+            except TypeError:
+                # ensta without session files; every login is a full one
+                return Web(username, password)
+
+        if sessions.is_fresh(username):
+            try:
+                client = create_client()
+                account = client.private_info()
+                logging.info(f"Reused cached session for {username}")
+                print(f"{ConsoleColors.GREEN}✓ Resumed saved session{ConsoleColors.RESET}")
+                return client, account
+            except Exception as e:
+                logging.warning(f"Cached session for {username} was rejected: {str(e)}")
+        sessions.invalidate(username)
+
+        client = create_client()
+        account = client.private_info()
+        sessions.mark_saved(username)
+        print(f"{ConsoleColors.GREEN}✓ Successfully logged in{ConsoleColors.RESET}")
+        return client, account
+
+    def load_work_index(self, username: str, export_path: str, journal: ProgressJournal) -> WorkIndex:
+        """Open the compiled work index, compiling it first if missing or stale"""
+        index_path = self.index_dir / f"{username}.idx"
+        if index_path.exists():
+            try:
+                index = WorkIndex(index_path)
+                if not index.is_stale(export_path) and index.flags == self._work_index_flags():
+                    replayed = index.replay_journal(journal)
+                    if replayed:
+                        logging.info(f"Replayed {replayed} journal entries into {index_path}")
+                    return index
+                index.close()
+                logging.info(f"{export_path} or export settings changed since {index_path} was compiled")
+            except ValueError as e:
+                logging.warning(f"Discarding unreadable work index: {str(e)}")
+        self.compile_work_index(username, export_path, journal)
+        return WorkIndex(index_path)
+
+    def _work_index_flags(self) -> int:
+        """Header flags describing the export settings an index is compiled with"""
+        return WorkIndex.FLAG_COMMENT_LIKES if CONFIG['export']['include_comment_likes'] else 0
+
+    def compile_work_index(self, username: str, export_path: str, journal: ProgressJournal,
+                           index_path: Optional[Path] = None) -> int:
+        """Compile the export into the binary work index for an account (or into index_path)
+
+        Done state is seeded from the journal and failed state from the
+        dead-letter queue, so a recompile retries neither.
+        """
+        index_path = index_path or self.index_dir / f"{username}.idx"
+        print(f"{ConsoleColors.BLUE}[*] Compiling {export_path}...{ConsoleColors.RESET}")
+        started = time.monotonic()
+        profiler = self.profiler
+        with profiler.span('journal'):
+            done_ids = journal.load()
+            failed_ids = {entry['media_id'] for entry in
+                          DeadLetterQueue(self.deadletter_dir / f"{username}.jsonl").load()}
+        stats = {'duplicates': 0, 'malformed': 0}
+
+        def records(batch_size=65536):
+            # Decode hrefs a column at a time and drop media IDs seen in earlier files
+            posts = iter_export_posts(export_path, CONFIG['export']['include_comment_likes'])
+            seen = set()
+            while True:
+                with profiler.span('parse'):
+                    batch = list(itertools.islice(posts, batch_size))
+                if not batch:
+                    return
+                with profiler.span('decode'):
+                    media_ids = decode_media_ids([post.href for post in batch], errors='zero')
+                profiler.tick()
+                for media_id, post in zip(media_ids.tolist(), batch):
+                    if not media_id:
+                        stats['malformed'] += 1
+                        logging.warning(f"Skipping malformed entry in {export_path}: {post.href!r}")
+                    elif media_id in seen:
+                        stats['duplicates'] += 1
+                    else:
+                        seen.add(media_id)
+                        yield media_id, post.timestamp, post.author
+
+        with profiler.span('compile'):
+            count = WorkIndex.compile(index_path, records(), export_path, done_ids, journal.offset,
+                                      self._work_index_flags(), failed_ids)
+        if stats['duplicates'] or stats['malformed']:
+            print(f"{ConsoleColors.YELLOW}[!] Skipped {stats['duplicates']} duplicate and "
+                  f"{stats['malformed']} malformed entries{ConsoleColors.RESET}")
+        logging.info(f"Compiled {count} posts into {index_path} in {time.monotonic() - started:.2f}s")
+        return count
 
     def center_text_in_box(text, box_width=48):
         """Center text in a box line, accounting for color codes"""
@@ -538,6 +3661,7 @@ class InstagramUnliker:
             print(menu_line("3", "Start Unliking"))
             print(menu_line("4", "View Stats"))
             print(menu_line("5", "Settings"))
+            print(menu_line("6", "Retry Failed Posts"))
             print(menu_line("0", "Exit"))
             print(f"╰{'─' * 40}╯")
             
@@ -556,6 +3680,8 @@ class InstagramUnliker:
                     self.show_statistics()
                 elif choice == "5":
                     self.show_settings()
+                elif choice == "6":
+                    self._reprocess_menu()
                 elif choice == "0":
                     print(f"\n{ConsoleColors.GREEN}✨ Thanks for using Instagram Unliker!")
                     print(f"👋 Have a great day!{ConsoleColors.RESET}")
@@ -583,27 +3709,26 @@ class InstagramUnliker:
 
     def _start_unliking_menu(self):
         """Display account selection menu for unliking"""
-        accounts = self.list_accounts()
-        if not accounts:
+        summaries = self.store.account_summaries()
+        if not summaries:
             print(f"{ConsoleColors.RED}[✗] No accounts configured. Please add an account first.{ConsoleColors.RESET}")
             return
+        accounts = [data['username'] for data in summaries]
             
         print(f"\n{ConsoleColors.BLUE}[#] Select Account{ConsoleColors.RESET}")
         print("-" * 30)
         
-        for i, acc in enumerate(accounts, 1):
+        for i, data in enumerate(summaries, 1):
             # Get account status
-            account_file = self.accounts_dir / f"{acc}.json"
             status = "Ready"
-            if account_file.exists():
-                with open(account_file) as f:
-                    data = json.load(f)
-                    if data.get('last_error'):
-                        status = f"Error: {data['last_error']}"
-                    elif data.get('last_run'):
-                        status = f"Last run: {datetime.fromisoformat(data['last_run']).strftime('%Y-%m-%d %H:%M')}"
+            if data.get('last_error'):
+                status = f"Error: {data['last_error']}"
+            elif data.get('last_run'):
+                status = f"Last run: {datetime.fromisoformat(data['last_run']).strftime('%Y-%m-%d %H:%M')}"
+            if data.get('queue_total'):
+                status += f" ({data['queue_done']}/{data['queue_total']} done)"
             
-            print(f"{ConsoleColors.BOLD}{i}{ConsoleColors.RESET}. [{acc}] - {status}")
+            print(f"{ConsoleColors.BOLD}{i}{ConsoleColors.RESET}. [{data['username']}] - {status}")
             
         try:
             choice = input(f"\n{ConsoleColors.BOLD}[>] Select account (0 to cancel): {ConsoleColors.RESET}")
@@ -615,17 +3740,42 @@ class InstagramUnliker:
                 print(f"{ConsoleColors.RED}[✗] Invalid selection{ConsoleColors.RESET}")
                 return
                 
-            self.unlike_posts(accounts[choice - 1])
+            post_filter = self._ask_post_filter()
+            if post_filter is None:
+                return
+            self.unlike_posts(accounts[choice - 1], post_filter)
             
         except ValueError:
             print(f"{ConsoleColors.RED}[✗] Invalid input{ConsoleColors.RESET}")
         except Exception as e:
             print(f"{ConsoleColors.RED}[✗] Error: {str(e)}{ConsoleColors.RESET}")
 
+    def _ask_post_filter(self) -> Optional[PostFilter]:
+        """Ask which liked posts to unlike; None if the input was invalid"""
+        answer = input(f"{ConsoleColors.BOLD}[>] Unlike all liked posts? (Y/n): {ConsoleColors.RESET}").strip().lower()
+        if answer in ('', 'y', 'yes'):
+            return PostFilter()
+        print(f"{ConsoleColors.CYAN}Press Enter to skip a filter{ConsoleColors.RESET}")
+        try:
+            since = input("Liked on or after (YYYY, YYYY-MM or YYYY-MM-DD): ").strip()
+            until = input("Liked before (YYYY, YYYY-MM or YYYY-MM-DD): ").strip()
+            since = parse_post_date(since) if since else None
+            until = parse_post_date(until) if until else None
+        except ValueError as e:
+            print(f"{ConsoleColors.RED}[✗] {str(e)}{ConsoleColors.RESET}")
+            return None
+        authors = input("Only posts by (usernames, comma separated): ")
+        authors = tuple(author.strip().lstrip('@') for author in authors.split(',') if author.strip())
+        order = input("Order - 1. export, 2. oldest first, 3. newest first [1]: ").strip() or '1'
+        if order not in ('1', '2', '3'):
+            print(f"{ConsoleColors.RED}[✗] Invalid order{ConsoleColors.RESET}")
+            return None
+        return PostFilter(since, until, authors, POST_ORDERS[int(order) - 1])
+
     def show_statistics(self):
         """Display statistics with improved UI"""
-        accounts = self.list_accounts()
-        if not accounts:
+        totals = self.store.totals()
+        if not totals['accounts']:
             print(f"{ConsoleColors.YELLOW}No accounts added yet{ConsoleColors.RESET}")
             input(f"\n{ConsoleColors.BOLD}Press Enter to continue...{ConsoleColors.RESET}")  # Added pause
             return
@@ -633,23 +3783,25 @@ class InstagramUnliker:
         print(f"\n{ConsoleColors.CYAN}📊 Statistics{ConsoleColors.RESET}")
         print("=" * 40)
         
-        total_unliked = 0
-        for username in accounts:
-            account_file = self.accounts_dir / f"{username}.json"
-            try:
-                with open(account_file, 'r') as f:
-                    data = json.load(f)
-                    
-                total_unliked += data.get('total_unliked', 0)
-                print(f"\n{ConsoleColors.BOLD}{ConsoleColors.BLUE}@{username}{ConsoleColors.RESET}")
-                print(f"📌 Unliked posts: {data.get('total_unliked', 0)}")
-                if data.get('last_run'):
-                    print(f"🕒 Last active: {datetime.fromisoformat(data['last_run']).strftime('%Y-%m-%d %H:%M')}")
-                print(f"✨ Status: {'OK' if not data.get('last_error') else 'Error'}")
-            except Exception as e:
-                print(f"{ConsoleColors.RED}Could not read data for {username}{ConsoleColors.RESET}")
+        week_ago = time.time() - 7 * 86400
+        for data in self.store.account_summaries():
+            print(f"\n{ConsoleColors.BOLD}{ConsoleColors.BLUE}@{data['username']}{ConsoleColors.RESET}")
+            print(f"📌 Unliked posts: {data['total_unliked']}")
+            if data.get('queue_total'):
+                print(f"📋 Queue: {data['queue_done']}/{data['queue_total']} done, {data['queue_failed']} failed")
+            if data.get('last_run'):
+                print(f"🕒 Last active: {datetime.fromisoformat(data['last_run']).strftime('%Y-%m-%d %H:%M')}")
+            print(f"✨ Status: {'OK' if not data.get('last_error') else 'Error'}")
+            week = self.run_history(data['username']).report(since=week_ago)
+            if week['events']:
+                print(f"📈 Last 7 days: {week['unliked']} unliked, {week['unliked_per_active_hour']}/h while active, "
+                      f"{week['error_rate']:.1%} errors, {week['pacing_efficiency']:.0%} pacing efficiency")
+                worst = max((row for row in week['hour_of_day'] if row['errors']),
+                            key=lambda row: row['errors'], default=None)
+                if worst is not None:
+                    print(f"⚠️  Most errors at {worst['hour']:02d}:00 ({worst['errors']} of {worst['calls']} calls)")
                 
-        print(f"\n{ConsoleColors.GREEN}🎉 Total unliked: {total_unliked} posts{ConsoleColors.RESET}")
+        print(f"\n{ConsoleColors.GREEN}🎉 Total unliked: {totals['total_unliked']} posts{ConsoleColors.RESET}")
         input(f"\n{ConsoleColors.BOLD}Press Enter to continue...{ConsoleColors.RESET}")  # Added pause
 
     def show_settings(self):
@@ -679,6 +3831,11 @@ class InstagramUnliker:
             print(f"  {ConsoleColors.BOLD}6.{ConsoleColors.RESET} Maximum Retries   : {ConsoleColors.GREEN}{CONFIG['max_retries']}{ConsoleColors.RESET}")
             print(f"  {ConsoleColors.BOLD}7.{ConsoleColors.RESET} Retry Delay       : {ConsoleColors.GREEN}{CONFIG['retry_delay']}{ConsoleColors.RESET} seconds")
             
+            # Export Settings
+            print(f"\n{ConsoleColors.YELLOW}▸ Export Settings{ConsoleColors.RESET}")
+            print(f"  {ConsoleColors.BOLD}8.{ConsoleColors.RESET} Export File       : {ConsoleColors.GREEN}{CONFIG['export']['path']}{ConsoleColors.RESET}")
+            print(f"  {ConsoleColors.BOLD}9.{ConsoleColors.RESET} Comment Likes     : {ConsoleColors.GREEN}{'On' if CONFIG['export']['include_comment_likes'] else 'Off'}{ConsoleColors.RESET}")
+            
             # Navigation
             print(f"\n{ConsoleColors.CYAN}▸ Navigation{ConsoleColors.RESET}")
             print(f"  {ConsoleColors.BOLD}0.{ConsoleColors.RESET} Save and Return")
@@ -695,7 +3852,7 @@ class InstagramUnliker:
                     
                 # Process the choice and get new value
                 try:
-                    if choice in ["1", "2", "3", "4", "5", "6", "7"]:
+                    if choice in ["1", "2", "3", "4", "5", "6", "7", "8", "9"]:
                         print(f"{ConsoleColors.WHITE}╭─{ConsoleColors.RESET}")
                         
                         if choice == "1":
@@ -736,6 +3893,16 @@ class InstagramUnliker:
                             new_value = int(input(f"{ConsoleColors.WHITE}╰─▸ {prompt}: {ConsoleColors.RESET}"))
                             CONFIG['retry_delay'] = new_value
                             
+                        elif choice == "8":
+                            prompt = "Enter path to liked_posts.json or the export ZIP"
+                            new_value = input(f"{ConsoleColors.WHITE}╰─▸ {prompt}: {ConsoleColors.RESET}").strip()
+                            if not new_value:
+                                raise ValueError("Path cannot be empty")
+                            CONFIG['export']['path'] = new_value
+                            
+                        elif choice == "9":
+                            CONFIG['export']['include_comment_likes'] = not CONFIG['export']['include_comment_likes']
+                            
                         # Save after each change
                         self.save_config()
                         print(f"\n{ConsoleColors.GREEN}✓ Setting updated successfully!{ConsoleColors.RESET}")
@@ -759,14 +3926,6 @@ class InstagramUnliker:
     def check_system_requirements(self) -> bool:
         """Check if system meets all requirements"""
         try:
-            # First ensure psutil is installed
-            try:
-                import psutil
-            except ImportError:
-                logging.warning("psutil not installed. Installing...")
-                if not self.install_requirements():
-                    return False
-
             # Check operating system
             os_name = platform.system()
             logging.info(f"Operating System: {os_name}")
@@ -775,8 +3934,15 @@ class InstagramUnliker:
             arch = platform.architecture()[0]
             logging.info(f"System Architecture: {arch}")
             
-            # Check available memory
+            # Check available memory (psutil is only needed here, so import it here)
             if os_name == "Windows":
+                try:
+                    import psutil
+                except ImportError:
+                    logging.warning("psutil not installed. Installing...")
+                    subprocess.run([sys.executable, "-m", "pip", "install", "psutil"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    import psutil
                 memory = psutil.virtual_memory()
                 available_mb = memory.available / (1024 * 1024)
                 logging.info(f"Available Memory: {available_mb:.2f} MB")
@@ -855,6 +4021,7 @@ def ensure_python_installed():
         if platform.system() == "Windows":
             print("Downloading Python installer...")
             # Download Python installer
+            import urllib.request
             with tempfile.NamedTemporaryFile(delete=False, suffix='.exe') as f:
                 url = "https://www.python.org/ftp/python/3.9.7/python-3.9.7-amd64.exe"
                 urllib.request.urlretrieve(url, f.name)
@@ -880,11 +4047,223 @@ def ensure_python_installed():
         print(f"Error checking/installing Python: {str(e)}")
         sys.exit(1)
 
+LikedPost = namedtuple('LikedPost', ['href', 'timestamp', 'author'], defaults=(None,))
+
+def iter_json_array(fp: IO[str], key: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Incrementally yield the elements of the top-level array stored under key
+
+    Only one chunk plus the element being decoded is held in memory, so memory
+    stays flat regardless of the file size.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    # Locate the opening bracket of the array
+    needle = f'"{key}"'
+    while True:
+        idx = buf.find(needle, pos)
+        if idx != -1:
+            pos = idx + len(needle)
+            break
+        # Keep a tail in case the key is split across chunks
+        pos = max(pos, len(buf) - len(needle))
+        if not fill():
+            return
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n:':
+            pos += 1
+        if pos < len(buf):
+            break
+        if not fill():
+            return
+    if buf[pos] != '[':
+        raise ValueError(f"Expected an array for '{key}'")
+    pos += 1
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buf):
+            if not fill():
+                raise ValueError(f"Unexpected end of file inside '{key}'")
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Element spans the chunk boundary
+            if not fill():
+                raise
+            continue
+        if end == len(buf) and not eof:
+            # A scalar may continue in the next chunk
+            if fill():
+                continue
+        pos = end
+        yield item
+
+def iter_liked_posts(fp: IO[str], key: str = 'likes_media_likes') -> Iterator[LikedPost]:
+    """Yield a LikedPost for every entry of an Instagram likes export"""
+    for entry in iter_json_array(fp, key):
+        for item in entry.get('string_list_data') or ():
+            href = item.get('href')
+            if href:
+                yield LikedPost(href, item.get('timestamp'), entry.get('title'))
+
+SHORTCODE_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+SHORTCODE_MAX_LENGTH = 11  # 66 bits, enough for any uint64 media ID
+_SHORTCODE_VALUES = {char: value for value, char in enumerate(SHORTCODE_ALPHABET)}
+_SHORTCODE_TABLE = bytes(
+    SHORTCODE_ALPHABET.find(chr(byte)) if chr(byte) in SHORTCODE_ALPHABET else 0xFF
+    for byte in range(256)
+)
+_POST_URL = (r'(?:https?://)?(?:www\.)?(?:instagram\.com|instagr\.am)/(?:[A-Za-z0-9_.]+/)?'
+             r'(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)/?(?:[?#][^\s]*)?')
+_POST_URL_PATTERN = re.compile(_POST_URL)
+_POST_URL_LINES = re.compile(f'^{_POST_URL}$', re.MULTILINE)
+
+def shortcode_from_url(href: str) -> str:
+    """Extract the shortcode from a /p/, /reel/ or /tv/ post URL"""
+    match = _POST_URL_PATTERN.fullmatch(href) if isinstance(href, str) else None
+    if match is None:
+        raise ValueError(f"Not an Instagram post URL: {href!r}")
+    return match.group(1)
+
+def shortcode_to_media_id(code: str) -> int:
+    """Convert a bare Instagram shortcode to its media ID"""
+    if not 0 < len(code) <= SHORTCODE_MAX_LENGTH:
+        raise ValueError(f"Invalid shortcode length: {code!r}")
+    value = 0
+    try:
+        for char in code:
+            value = (value << 6) | _SHORTCODE_VALUES[char]
+    except KeyError:
+        raise ValueError(f"Invalid character in shortcode: {code!r}") from None
+    if value >> 64:
+        raise ValueError(f"Shortcode does not fit a 64-bit media ID: {code!r}")
+    return value
+
+LIKES_FILE_PATTERN = re.compile(r'(?:^|/)liked_(posts|comments)(?:_(\d+))?\.json$')
+LIKES_FILE_KEYS = {'posts': 'likes_media_likes', 'comments': 'likes_comment_likes'}
+
+def find_likes_files(names: List[str], include_comments: bool = False) -> List[Tuple[str, str]]:
+    """Pick the likes files out of an export listing as (name, array key) pairs
+
+    Liked posts come before liked comments and split parts are kept in order.
+    """
+    found = []
+    for name in names:
+        match = LIKES_FILE_PATTERN.search(name)
+        if match is None or (match.group(1) == 'comments' and not include_comments):
+            continue
+        part = int(match.group(2) or 1)
+        found.append((match.group(1) != 'posts', part, name, LIKES_FILE_KEYS[match.group(1)]))
+    return [(name, key) for _, _, name, key in sorted(found)]
+
+def iter_export_posts(export_path, include_comments: bool = False) -> Iterator[LikedPost]:
+    """Stream liked posts from a liked_posts.json file or a data-download ZIP
+
+    ZIP members are read straight out of the archive without extracting them.
+    """
+    if not zipfile.is_zipfile(export_path):
+        with open(export_path, 'r', encoding='utf-8') as f:
+            yield from iter_liked_posts(f)
+        return
+    with zipfile.ZipFile(export_path) as archive:
+        members = find_likes_files(archive.namelist(), include_comments)
+        if not members:
+            logging.warning(f"No likes files found in {export_path}")
+        for name, key in members:
+            logging.info(f"Reading {name} from {export_path}")
+            with archive.open(name) as raw:
+                yield from iter_liked_posts(io.TextIOWrapper(raw, encoding='utf-8'), key)
+
 def instagram_code_to_media_id(code):
-    """Convert Instagram shortcode to media ID"""
-    charmap = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
-    code = code.split('/')[-2]
-    return sum(charmap.index(char) * (64 ** i) for i, char in enumerate(reversed(code)))
+    """Convert Instagram post URL to media ID"""
+    return shortcode_to_media_id(shortcode_from_url(code))
+
+def decode_media_ids(hrefs, errors: str = 'raise'):
+    """Decode a batch of post URLs into media IDs
+
+    Returns a NumPy uint64 array when NumPy is installed and an array('Q')
+    otherwise. With errors='zero' invalid URLs decode to 0 instead of raising.
+    """
+    if errors not in ('raise', 'zero'):
+        raise ValueError(f"Unknown errors mode: {errors!r}")
+    hrefs = hrefs if isinstance(hrefs, list) else list(hrefs)
+
+    # One regex pass over the whole column; fall back per item only if some fail.
+    # Line i must be href i, so an href containing a newline forces the fallback.
+    codes = None
+    if all(isinstance(href, str) for href in hrefs):
+        column = '\n'.join(hrefs)
+        if column.count('\n') == len(hrefs) - 1:
+            codes = _POST_URL_LINES.findall(column)
+            if len(codes) != len(hrefs):
+                codes = None
+    if codes is None:
+        codes = []
+        for position, href in enumerate(hrefs):
+            try:
+                codes.append(shortcode_from_url(href))
+            except ValueError as e:
+                if errors == 'raise':
+                    raise ValueError(f"Entry {position}: {str(e)}") from None
+                codes.append('')
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is None:
+        media_ids = array('Q')
+        for position, code in enumerate(codes):
+            try:
+                media_ids.append(shortcode_to_media_id(code) if code else 0)
+            except ValueError as e:
+                if errors == 'raise':
+                    raise ValueError(f"Entry {position}: {str(e)}") from None
+                media_ids.append(0)
+        return media_ids
+
+    width = SHORTCODE_MAX_LENGTH
+    too_long = [position for position, code in enumerate(codes) if len(code) > width]
+    if too_long and errors == 'raise':
+        raise ValueError(f"Entry {too_long[0]}: Invalid shortcode length: {codes[too_long[0]]!r}")
+    padded = ''.join(code.rjust(width, 'A') if len(code) <= width else 'A' * width for code in codes)
+    chars = np.frombuffer(padded.encode('ascii'), dtype=np.uint8).reshape(-1, width)
+    values = np.frombuffer(_SHORTCODE_TABLE, dtype=np.uint8)[chars]
+    # The leading character may only carry 4 of its 6 bits into a uint64
+    invalid = values[:, 0] >= 16
+    media_ids = np.zeros(len(codes), dtype=np.uint64)
+    shift = np.uint64(6)
+    for column in range(width):
+        media_ids <<= shift
+        media_ids |= values[:, column]
+    if too_long:
+        invalid[too_long] = True
+    if invalid.any():
+        if errors == 'raise':
+            position = int(np.flatnonzero(invalid)[0])
+            raise ValueError(f"Entry {position}: Shortcode does not fit a 64-bit media ID: {codes[position]!r}")
+        media_ids[invalid] = 0
+    return media_ids
 
 def get_visible_length(text):
     """Calculate the visible length of text by removing ANSI color codes"""
@@ -904,36 +4283,361 @@ def menu_line(number, text, box_width=40):
     
     return f"{prefix}{content}{' ' * padding}│{ConsoleColors.RESET}"
 
-def main():
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Command line for unattended use; no command opens the interactive menu"""
+    parser = argparse.ArgumentParser(
+        prog="instagram_unliker.py",
+        description="Instagram Mass Unliker. Run without a command for the interactive menu.",
+        epilog="exit codes: 0 done, 1 error, 2 usage, 3 unknown account or export, 4 login failed, "
+               "5 missing dependencies, 6 finished with dead-lettered posts, 75 stopped (safe to restart)"
+    )
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    def add_account_options(command):
+        accounts = command.add_mutually_exclusive_group(required=True)
+        accounts.add_argument('--account', action='append', metavar='USERNAME',
+                              help="account to use (repeat for several)")
+        accounts.add_argument('--all', action='store_true', help="every enabled account")
+
+    def add_export_option(command, note="default: the saved setting"):
+        command.add_argument('--export', metavar='PATH',
+                             help=f"liked_posts.json or data-download ZIP ({note})")
+
+    def post_date(text):
+        try:
+            return parse_post_date(text)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    def add_filter_options(command):
+        command.add_argument('--since', type=post_date, metavar='DATE',
+                             help="only posts liked on or after DATE (YYYY, YYYY-MM or YYYY-MM-DD)")
+        command.add_argument('--until', type=post_date, metavar='DATE',
+                             help="only posts liked before DATE")
+        command.add_argument('--author', action='append', metavar='USERNAME',
+                             help="only posts by this author (repeat for several)")
+        command.add_argument('--order', choices=POST_ORDERS, default='export',
+                             help="export keeps the export's order (default)")
+
+    def add_profile_options(command):
+        command.add_argument('--profile', action='store_true',
+                             help="time each stage in spans and write them to profile/ACCOUNT-TIME-STAGE/")
+        command.add_argument('--profile-cprofile', action='store_true', help="with --profile, also run cProfile")
+        command.add_argument('--profile-tracemalloc', action='store_true',
+                             help="with --profile, also trace memory allocations")
+        command.add_argument('--profile-interval', type=float, default=60, metavar='SECONDS',
+                             help="seconds between cProfile and tracemalloc snapshots (default: 60)")
+
+    ingest = commands.add_parser('ingest', help="compile the likes export into the work queues")
+    add_account_options(ingest)
+    add_export_option(ingest)
+    add_profile_options(ingest)
+
+    run = commands.add_parser('run', help="unlike queued posts")
+    add_account_options(run)
+    add_export_option(run)
+    run.add_argument('--progress', choices=('auto', 'bar', 'json'), default='auto',
+                     help="auto writes JSON lines when stdout is not a terminal")
+    run.add_argument('--progress-interval', type=float, default=30, metavar='SECONDS',
+                     help="seconds between JSON progress lines (default: 30)")
+    run.add_argument('--metrics-port', type=int, metavar='PORT',
+                     help="serve Prometheus metrics on 127.0.0.1:PORT/metrics (default: the saved setting)")
+    add_profile_options(run)
+    add_filter_options(run)
+
+    stats = commands.add_parser('stats', help="lifetime totals and recent runs")
+    stats.add_argument('--json', action='store_true', help="print one JSON document")
+
+    status = commands.add_parser('status', help="queue and run state per account")
+    status.add_argument('--account', action='append', metavar='USERNAME')
+    status.add_argument('--json', action='store_true', help="print one JSON document")
+
+    plan = commands.add_parser('plan', help="simulate how long the pending queues will take")
+    plan.add_argument('--account', action='append', metavar='USERNAME')
+    plan.add_argument('--items', type=int, metavar='N', help="plan for N posts instead of the pending queue")
+    plan.add_argument('--simulations', type=int, default=2000, metavar='N',
+                      help="Monte Carlo runs per account (default: 2000)")
+    plan.add_argument('--json', action='store_true', help="print one JSON document")
+    add_filter_options(plan)
+
+    control = commands.add_parser('control', help="pause, resume, drain, query or retune a running job")
+    control.add_argument('action', choices=ControlServer.COMMANDS)
+    control.add_argument('--account', action='append', required=True, metavar='USERNAME')
+    control.add_argument('--delay-min', type=float, metavar='SECONDS')
+    control.add_argument('--delay-max', type=float, metavar='SECONDS')
+    control.add_argument('--break-min', type=float, metavar='SECONDS')
+    control.add_argument('--break-max', type=float, metavar='SECONDS')
+    control.add_argument('--break-probability', type=float, metavar='P')
+
+    report = commands.add_parser('report', help="throughput, error rates and pacing efficiency from the run history")
+    report.add_argument('--account', action='append', metavar='USERNAME')
+    report.add_argument('--since', type=post_date, metavar='DATE', help="only calls on or after DATE")
+    report.add_argument('--until', type=post_date, metavar='DATE', help="only calls before DATE")
+    report.add_argument('--json', action='store_true', help="print one JSON document, including hourly rows")
+
+    reconcile = commands.add_parser('reconcile', help="rebuild the queues from a fresh export, keeping past progress")
+    reconcile.add_argument('--account', action='append', required=True, metavar='USERNAME')
+    add_export_option(reconcile, "default: the saved setting; saved for later runs unless --dry-run")
+    reconcile.add_argument('--dry-run', action='store_true', help="only report the differences")
+    reconcile.add_argument('--json', action='store_true', help="print one JSON document")
+
+    reprocess = commands.add_parser('reprocess', help="requeue dead-lettered posts")
+    reprocess.add_argument('--account', action='append', required=True, metavar='USERNAME')
+    return parser
+
+def run_cli(args: argparse.Namespace, out: IO[str]) -> int:
+    """Run one headless command and return its ExitCode
+
+    Messages for people go to stderr; out only receives results and progress
+    records, so it can be parsed by whatever supervises the process.
+    """
+    unliker = InstagramUnliker()
+    # Outside a run, a signal should stop the command rather than report success
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    post_filter = None
+    if args.command in ('run', 'plan'):
+        post_filter = PostFilter(args.since, args.until,
+                                 tuple(author.lstrip('@') for author in args.author or ()), args.order)
+    usernames = getattr(args, 'account', None) or []
+    if getattr(args, 'all', False):
+        usernames = [username for username in unliker.list_accounts()
+                     if CONFIG['accounts'].get(username, {}).get('enabled', True)]
+    for username in usernames:
+        if not unliker.store.has_account(username):
+            print(f"{ConsoleColors.RED}[✗] Account not found for {username}{ConsoleColors.RESET}")
+            return ExitCode.NOT_FOUND
+
+    export, metrics = CONFIG['export'], CONFIG['metrics']
+    # Only for this invocation; the saved settings are left alone
+    if getattr(args, 'export', None):
+        CONFIG['export'] = dict(export, path=args.export)
+    if getattr(args, 'metrics_port', None) is not None:
+        CONFIG['metrics'] = dict(metrics, port=args.metrics_port)
+    try:
+        if args.command in ('ingest', 'run'):
+            if args.profile:
+                unliker.profiling = {"cprofile": args.profile_cprofile, "tracemalloc": args.profile_tracemalloc,
+                                     "interval": args.profile_interval}
+            elif args.profile_cprofile or args.profile_tracemalloc:
+                print(f"{ConsoleColors.RED}[✗] --profile-cprofile and --profile-tracemalloc need --profile{ConsoleColors.RESET}")
+                return ExitCode.USAGE
+
+        if args.command == 'ingest':
+            return ExitCode.combine([unliker.ingest(username) for username in usernames])
+
+        if args.command == 'run':
+            if not unliker.environment_checked:
+                if not unliker.check_dependencies():
+                    return ExitCode.DEPENDENCIES
+                unliker.save_environment_stamp()
+            if args.progress == 'json' or (args.progress == 'auto' and not out.isatty()):
+                unliker.progress_stream = out
+                unliker.progress_interval = args.progress_interval
+            codes = []
+            for username in usernames:
+                code = unliker.unlike_posts(username, post_filter)
+                codes.append(code)
+                if unliker.progress_stream is not None:
+                    runs = unliker.store.recent_runs(username, limit=1)
+                    last_run = runs[0] if runs else {}
+                    out.write(json.dumps({
+                        "ts": datetime.now().isoformat(timespec='seconds'),
+                        "event": "finish",
+                        "account": username,
+                        "exit_code": code,
+                        "status": last_run.get('status'),
+                        "unliked": last_run.get('unliked', 0),
+                        "failed": last_run.get('failed', 0)
+                    }) + '\n')
+                    out.flush()
+                if code == ExitCode.STOPPED:
+                    break
+            return ExitCode.combine(codes)
+
+        if args.command == 'control':
+            settings = {}
+            for section, key in (('delay', 'min'), ('delay', 'max'), ('break', 'min'), ('break', 'max'),
+                                 ('break', 'probability')):
+                value = getattr(args, f"{section}_{key}")
+                if value is not None:
+                    settings.setdefault(section, {})[key] = value
+            if args.action == 'set' and not settings:
+                print(f"{ConsoleColors.RED}[✗] set needs at least one --delay-* or --break-* option{ConsoleColors.RESET}")
+                return ExitCode.USAGE
+            if not ControlServer.supported():
+                print(f"{ConsoleColors.RED}[✗] Control sockets need Unix domain sockets{ConsoleColors.RESET}")
+                return ExitCode.ERROR
+            code = ExitCode.OK
+            for username in usernames:
+                try:
+                    reply = control_request(unliker.control_path(username), args.action, settings=settings)
+                except OSError as e:
+                    print(f"{ConsoleColors.RED}[✗] No running job for {username}: {str(e)}{ConsoleColors.RESET}")
+                    code = ExitCode.NOT_FOUND
+                    continue
+                out.write(json.dumps(reply) + '\n')
+                if not reply.get('ok'):
+                    code = ExitCode.USAGE
+            return code
+
+        if args.command == 'report':
+            reports = [unliker.report(username, args.since, args.until)
+                       for username in usernames or unliker.list_accounts()]
+            if args.json:
+                out.write(json.dumps({"reports": reports}) + '\n')
+                return ExitCode.OK
+            for report in reports:
+                if not report['events']:
+                    out.write(f"{report['account']}: no calls recorded\n")
+                    continue
+                out.write(f"{report['account']}: {report['events']} calls, {report['unliked']} unliked, "
+                          f"{report['error_rate']:.1%} errors, {report['unliked_per_active_hour']}/h over "
+                          f"{report['active_hours']} active hours (peak {report['peak_hour']['unliked']} at "
+                          f"{report['peak_hour']['hour'].replace('T', ' ')}), "
+                          f"{report['pacing_efficiency']:.0%} pacing efficiency, "
+                          f"mean latency {report['latency_mean']}s, mean wait {report['wait_mean']}s\n")
+                out.write("  hour   calls  unliked  errors\n")
+                for row in report['hour_of_day']:
+                    if row['calls']:
+                        out.write(f"  {row['hour']:02d}:00 {row['calls']:>7} {row['unliked']:>8} "
+                                  f"{row['error_rate']:>7.1%}\n")
+            return ExitCode.OK
+
+        if args.command == 'reconcile':
+            reports = []
+            for username in usernames:
+                report = unliker.reconcile(username, args.dry_run)
+                if report is None:
+                    return ExitCode.NOT_FOUND if not os.path.exists(CONFIG['export']['path']) else ExitCode.ERROR
+                reports.append(report)
+            if args.export and not args.dry_run:
+                # The queue now follows this export; a run against the old one would recompile it
+                export = CONFIG['export']
+                unliker.save_config()
+            if args.json:
+                out.write(json.dumps({"reconciled": reports}) + '\n')
+                return ExitCode.OK
+            for report in reports:
+                out.write(f"{report['account']}: {report['queued']} of {report['total']} posts queued "
+                          f"({report['newly_liked']} newly liked, {report['still_pending']} still pending); "
+                          f"{report['confirmed_removed']} confirmed removed, "
+                          f"{report['removed_elsewhere']} removed elsewhere; "
+                          f"{report['failed_still_liked']} failed still liked, "
+                          f"{report['failed_removed']} failed now removed; "
+                          f"{report['unliked_still_listed']} unliked but still listed"
+                          f"{' (dry run)' if report['dry_run'] else ''}\n")
+            return ExitCode.OK
+
+        if args.command == 'reprocess':
+            for username in usernames:
+                unliker.reprocess_dead_letters(username)
+            return ExitCode.OK
+
+        if args.command == 'status':
+            statuses = [unliker.account_status(username) for username in usernames or unliker.list_accounts()]
+            if args.json:
+                out.write(json.dumps({"accounts": statuses}) + '\n')
+                return ExitCode.OK
+            for status in statuses:
+                queue = status['queue']
+                line = f"{status['account']}: {'running' if status['running'] else 'idle'}"
+                if not status['enabled']:
+                    line += " (disabled)"
+                if queue:
+                    line += (f", {queue['done']}/{queue['total']} done, {queue['failed']} failed, "
+                             f"{queue['pending']} pending")
+                else:
+                    line += ", no queue yet"
+                line += f", {status['dead_letters']} dead-lettered"
+                if status['last_run']:
+                    last_run = status['last_run']
+                    line += f", last run #{last_run['id']} {last_run['status']} at {last_run['started_at'][:16]}"
+                out.write(line + '\n')
+            return ExitCode.OK
+
+        if args.command == 'plan':
+            plans = [unliker.plan(username, args.items, max(1, args.simulations), post_filter)
+                     for username in usernames or unliker.list_accounts()]
+            if args.json:
+                out.write(json.dumps({"plans": plans}) + '\n')
+                return ExitCode.OK
+            for plan in plans:
+                seconds = plan['seconds']
+                out.write(f"{plan['account']}: {plan['items']} posts, P50 {format_duration(seconds['p50'])} "
+                          f"(by {plan['finish_p50'].replace('T', ' ')}), P90 {format_duration(seconds['p90'])} "
+                          f"(by {plan['finish_p90'].replace('T', ' ')})\n")
+            return ExitCode.OK
+
+        if args.command == 'stats':
+            totals = unliker.store.totals()
+            accounts = unliker.store.account_summaries()
+            runs = unliker.store.recent_runs(limit=10)
+            if args.json:
+                out.write(json.dumps({"totals": totals, "accounts": accounts, "recent_runs": runs}) + '\n')
+                return ExitCode.OK
+            out.write(f"Accounts: {totals['accounts']}, total unliked: {totals['total_unliked']}, "
+                      f"with errors: {totals['with_errors']}\n")
+            for data in accounts:
+                out.write(f"  @{data['username']}: {data['total_unliked']} unliked, "
+                          f"last run {data['last_run'][:16] if data['last_run'] else 'never'}\n")
+            if runs:
+                out.write("Recent runs:\n")
+                for run in runs:
+                    out.write(f"  #{run['id']} @{run['username']} {run['started_at'][:16]} {run['status']}: "
+                              f"{run['unliked']} unliked, {run['failed']} failed\n")
+            return ExitCode.OK
+    finally:
+        CONFIG['export'] = export
+        CONFIG['metrics'] = metrics
+    return ExitCode.USAGE
+
+def main(argv: Optional[List[str]] = None):
     """Main entry point with improved initialization and dependency checking"""
+    args = build_arg_parser().parse_args(argv)
+    if args.command is not None:
+        out = sys.stdout
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                code = run_cli(args, out)
+        except KeyboardInterrupt:
+            code = ExitCode.STOPPED
+        except Exception as e:
+            logging.error(f"Fatal error: {str(e)}", exc_info=True)
+            code = ExitCode.ERROR
+        sys.exit(code)
+
     try:
         # Display welcome message
         print("\nWelcome to Instagram Mass Unliker!")
         print("Checking system requirements...")
         
-        # Create instance and check dependencies first
+        # Create instance (this also loads the configuration)
         unliker = InstagramUnliker()
-        if not unliker.check_dependencies():
-            print("Error: Failed to install required dependencies.")
-            print("Please try installing them manually:")
-            print("pip install psutil tqdm colorama requests ensta")
-            sys.exit(1)
         
-        # Continue with other checks
-        if not unliker.check_system_requirements():
-            print("Error: System requirements not met.")
-            print("Please check the logs for more information.")
-            sys.exit(1)
+        # The checks only run again when the interpreter or packages change
+        if not unliker.environment_checked:
+            if not unliker.check_dependencies():
+                print("Error: Failed to install required dependencies.")
+                print("Please try installing them manually:")
+                print("pip install psutil tqdm colorama requests ensta")
+                sys.exit(1)
+            
+            # Continue with other checks
+            if not unliker.check_system_requirements():
+                print("Error: System requirements not met.")
+                print("Please check the logs for more information.")
+                sys.exit(1)
+            
+            if not unliker.check_python_version():
+                sys.exit(1)
+            
+            unliker.save_environment_stamp()
         
         # Handle Ctrl+C gracefully
         signal.signal(signal.SIGINT, lambda sig, frame: sys.exit(0))
         
-        # Perform initial setup
-        if not unliker.check_python_version():
-            sys.exit(1)
-        
-        unliker.check_and_create_config()
-        
         # Show interactive menu
         unliker.show_menu()
 
@@ -0,0 +1,152 @@
+"""Correctness tests for the shortcode-to-media-ID decoder
+
+The expected values do not come from re-running the decoder's own base-64
+arithmetic. They are the alphabet and ID layout Instagram uses, boundary
+values worked out by hand from the positional weights, and shortcodes of
+public posts whose media ID or publication date is on record. Every pair is
+decoded from /p/, /reel/, /reels/ and /tv/ URLs with and without a trailing
+slash, query string or username segment, through the scalar decoder and
+both batch backends (NumPy when installed, and the array('Q') fallback).
+
+    python -m pytest -q tests
+"""
+import sys
+from datetime import date, datetime, timezone
+
+import pytest
+
+from instagram_unliker import (
+    SHORTCODE_ALPHABET, shortcode_to_media_id, instagram_code_to_media_id, decode_media_ids
+)
+
+# Media IDs are (milliseconds since this epoch) << 23 | shard and sequence bits
+INSTAGRAM_EPOCH_MS = 1314220021721
+
+KNOWN_PAIRS = [
+    # One character and one carry: the alphabet indexes of 'B', '_' and 'BA'
+    ("B", 1),
+    ("_", 63),
+    ("BA", 64),
+    # Eleven characters give 66 bits; 'B' then ten 'A's is 1 * 64 ** 10
+    ("BAAAAAAAAAA", 2 ** 60),
+    # 'H' (7) and 'I' (8) in the 2 ** 60 place straddle the sign bit
+    ("H__________", 2 ** 63 - 1),
+    ("IAAAAAAAAAA", 2 ** 63),
+    # 'P' (15) in the 2 ** 60 place is the top of the uint64 range; '-' is 62
+    ("P_________-", 2 ** 64 - 2),
+    ("P__________", 2 ** 64 - 1),
+    # The 2015 post that is the commonly cited example of the shortcode/media ID mapping
+    ("ybyPRoQWzX", 908540701891980503),
+]
+
+# Public posts with a well-known publication date (UTC)
+DATED_POSTS = [
+    ("ybyPRoQWzX", date(2015, 1, 29)),
+    ("Be3rTNplCHf", date(2018, 2, 6)),   # Kylie Jenner announcing Stormi
+    ("BsOGulcndj-", date(2019, 1, 4)),   # @world_record_egg
+]
+
+URL_FORMS = [
+    "https://www.instagram.com/p/{}/",
+    "https://www.instagram.com/reel/{}/",
+    "https://www.instagram.com/reels/{}/",
+    "https://www.instagram.com/tv/{}/",
+    "https://www.instagram.com/p/{}",
+    "https://www.instagram.com/reel/{}",
+    "https://www.instagram.com/p/{}/?utm_source=ig_web_copy_link&igsh=MWQ1ZGUxMzBkMA==",
+    "https://www.instagram.com/p/{}?img_index=2",
+    "https://www.instagram.com/tv/{}/#comments",
+    "https://www.instagram.com/some.user_1/p/{}/",
+    "https://instagram.com/p/{}/",
+    "http://www.instagram.com/p/{}/",
+    "www.instagram.com/p/{}/",
+    "https://instagr.am/p/{}/",
+]
+
+INVALID = [
+    'junk',
+    '',
+    None,
+    123,
+    "https://www.instagram.com/stories/some.user/3141592653589793238/",
+    "https://www.instagram.com/some.user/",
+    "https://example.com/p/ybyPRoQWzX/",
+    "https://www.instagram.com/p/ybyPRoQWzX/extra/",
+    "https://www.instagram.com/p/ybyP%RoQWzX/",
+    " https://www.instagram.com/p/ybyPRoQWzX/",
+    "https://www.instagram.com/p/QAAAAAAAAAA/",   # 2**64, one past the uint64 range
+    "https://www.instagram.com/p/AAAAAAAAAAAA/",  # Twelve characters
+    "https://www.instagram.com/p/ybyPRoQWzX/\nhttps://www.instagram.com/p/AAAB/",
+]
+
+HREFS = [form.format(code) for form in URL_FORMS for code, _ in KNOWN_PAIRS]
+EXPECTED = [media_id for _ in URL_FORMS for _, media_id in KNOWN_PAIRS]
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    """Runs a batch test once per decode_media_ids backend"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        # Makes "import numpy" fail inside decode_media_ids
+        monkeypatch.setitem(sys.modules, 'numpy', None)
+    return request.param
+
+
+def decoded(hrefs, errors='raise'):
+    return [int(media_id) for media_id in decode_media_ids(hrefs, errors=errors)]
+
+
+def test_alphabet_is_url_safe_base64():
+    assert SHORTCODE_ALPHABET == 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+
+@pytest.mark.parametrize('code, published', DATED_POSTS)
+def test_media_id_carries_publication_date(code, published):
+    milliseconds = (shortcode_to_media_id(code) >> 23) + INSTAGRAM_EPOCH_MS
+    assert datetime.fromtimestamp(milliseconds / 1000, timezone.utc).date() == published
+
+
+@pytest.mark.parametrize('code, media_id', KNOWN_PAIRS)
+def test_scalar_known_pairs(code, media_id):
+    assert shortcode_to_media_id(code) == media_id
+    for form in URL_FORMS:
+        assert instagram_code_to_media_id(form.format(code)) == media_id, form
+
+
+@pytest.mark.parametrize('href', INVALID)
+def test_scalar_invalid_raises(href):
+    with pytest.raises((ValueError, TypeError)):
+        instagram_code_to_media_id(href)
+
+
+def test_batch_known_pairs(backend):
+    assert decoded(HREFS, 'raise') == EXPECTED
+    assert decoded(HREFS, 'zero') == EXPECTED
+
+
+@pytest.mark.parametrize('bad', INVALID)
+def test_batch_invalid_entry(backend, bad):
+    batch = HREFS[:3] + [bad] + HREFS[3:6]
+    with pytest.raises(ValueError, match='^Entry 3:'):
+        decode_media_ids(batch, errors='raise')
+    assert decoded(batch, 'zero') == EXPECTED[:3] + [0] + EXPECTED[3:6]
+
+
+def test_batch_href_with_newline_keeps_rows_aligned(backend):
+    batch = HREFS[:2] + [INVALID[-1], 'junk'] + HREFS[2:4]
+    assert decoded(batch, 'zero') == EXPECTED[:2] + [0, 0] + EXPECTED[2:4]
+    with pytest.raises(ValueError, match='^Entry 2:'):
+        decode_media_ids(batch, errors='raise')
+
+
+def test_batch_interleaved_invalid_rows(backend):
+    mixed = [href for pair in zip(HREFS, INVALID) for href in pair]
+    assert decoded(mixed, 'zero') == [value for media_id in EXPECTED[:len(INVALID)] for value in (media_id, 0)]
+
+
+def test_batch_empty_and_unknown_mode(backend):
+    assert len(decode_media_ids([])) == 0
+    with pytest.raises(ValueError):
+        decode_media_ids(HREFS[:1], errors='ignore')
@@ -0,0 +1,158 @@
+"""Pacing decisions against the local fake client's 429 responses
+
+Drives RateGovernor on a simulated clock through FakeInstagramClient rate
+limits, with and without Retry-After: the interval must back off on each
+429, hold_until must cover the Retry-After, and once the throttling stops
+healthy responses must bring the interval back to its floor. Then runs the
+unlike engine end to end against a rate-limited fake client, raising 429s
+and answering them with False as ensta does, and checks from the client's
+side that every 429 was followed by the hold, that pacing recovered to the
+floor, and that no post was recorded as unliked unless the client really
+unliked it. The engine tests pace real calls and take several seconds each.
+"""
+import io
+import copy
+import time
+import logging
+import contextlib
+
+import pytest
+
+from bench_pipeline import write_export
+from instagram_unliker import (
+    CONFIG, InstagramUnliker, FakeInstagramClient, FakeInstagramError, RateGovernor,
+    ProgressJournal, retry_after_of
+)
+
+FLOOR = 0.05  # Seconds between calls once pacing has recovered
+POSTS = 25
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+class RecordingClient(FakeInstagramClient):
+    """Fake client that keeps the time and outcome of every unlike call"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.log = []  # (monotonic time, 'ok' | 'false' | 'error')
+
+    def unlike(self, media_id):
+        at = time.monotonic()
+        try:
+            result = super().unlike(media_id)
+        except FakeInstagramError:
+            self.log.append((at, 'error'))
+            raise
+        self.log.append((at, 'ok' if result else 'false'))
+        return result
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Runs in a scratch directory and restores CONFIG afterwards"""
+    monkeypatch.chdir(tmp_path)
+    saved = copy.deepcopy(CONFIG)
+    yield CONFIG
+    CONFIG.clear()
+    CONFIG.update(saved)
+
+
+@pytest.mark.parametrize('retry_after', [None, 30.0])
+def test_simulated_backoff_and_recovery(retry_after):
+    """RateGovernor and the fake client's sliding-window limit on one clock"""
+    clock = SimulatedClock()
+    client = FakeInstagramClient(rate_limit=(5, 10.0), retry_after=retry_after, clock=clock, sleep=clock.sleep)
+    governor = RateGovernor(min_interval=1.0, max_interval=600.0, jitter=0, clock=clock)
+
+    throttles = 0
+    # Every simulated throttle logs a warning; only the results matter here
+    logging.disable(logging.WARNING)
+    try:
+        for media_id in range(60):
+            clock.sleep(governor.reserve())
+            try:
+                client.unlike(media_id)
+            except FakeInstagramError as e:
+                throttles += 1
+                before = governor.interval
+                governor.on_throttle(retry_after_of(e), 'HTTP 429')
+                assert governor.interval > before, "interval did not back off"
+                hold = retry_after if retry_after is not None else governor.interval
+                assert governor.hold_until >= clock() + hold
+                wait = governor.reserve()
+                assert wait >= hold, f"next request after {wait:.1f}s, inside the {hold}s hold"
+                clock.sleep(wait)
+            else:
+                governor.on_success()
+        assert throttles, "the fake client never answered 429"
+
+        # Instagram stops throttling: healthy responses walk back down to the floor
+        governor.on_throttle(retry_after, 'HTTP 429')
+    finally:
+        logging.disable(logging.NOTSET)
+    client.rate_limit = None
+    backed_off = governor.interval
+    for media_id in range(60, 60 + int(backed_off) + 1):
+        clock.sleep(governor.reserve())
+        client.unlike(media_id)
+        governor.on_success()
+    assert governor.interval == governor.min_interval
+
+
+@pytest.mark.parametrize('retry_after, errors_as_false', [(None, False), (2.5, False), (None, True)])
+def test_engine_holds_after_throttle(config, tmp_path, retry_after, errors_as_false):
+    """UnlikeEngine against a rate-limited fake client, measured from the client's side"""
+    account = 'governor'
+    export_path = str(tmp_path / f"{account}.json")
+    write_export(export_path, POSTS)
+    clients = []
+
+    def client_factory(username, password):
+        client = RecordingClient(username, rate_limit=(10, 1.0), retry_after=retry_after,
+                                 errors_as_false=errors_as_false)
+        clients.append(client)
+        return client
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        unliker = InstagramUnliker()
+        config['delay'] = {"min": FLOOR, "max": FLOOR}
+        config['break']['probability'] = 0
+        config['pacing']['jitter'] = 0
+        config['retry_delay'] = 0
+        config['max_retries'] = 10
+        config['export']['path'] = export_path
+        unliker.store.add_account(account, 'check')
+        config['accounts'] = unliker.store.account_options()
+        unliker.client_factory = client_factory
+        unliker.progress_stream = io.StringIO()
+        unliker.progress_interval = float('inf')
+        exit_code = unliker.unlike_posts(account)
+
+    client = clients[-1]
+    log = client.log
+    rejected = [i for i, (_, outcome) in enumerate(log) if outcome != 'ok']
+    assert exit_code == 0
+    assert rejected, "the fake client never throttled"
+    # After a throttle the governor holds for at least the Retry-After, or its doubled interval (2s or more)
+    hold = max(retry_after or 0.0, 2.0)
+    for i in rejected:
+        if i + 1 < len(log):
+            assert log[i + 1][0] - log[i][0] >= hold * 0.95, f"call {i + 1} came inside the {hold:.1f}s hold"
+    # The last stretch of healthy calls runs at the floor again
+    tail = log[rejected[-1] + 1:]
+    gaps = [b[0] - a[0] for a, b in zip(tail[2:], tail[3:])]
+    assert gaps and max(gaps) <= FLOOR + 0.2, f"pacing did not recover to the {FLOOR}s floor: {gaps}"
+
+    journaled = ProgressJournal(unliker.journal_dir / f"{account}.journal").load()
+    assert journaled <= client.unliked, "posts journaled but still liked"
+    assert len(client.unliked) == POSTS